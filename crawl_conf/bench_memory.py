@@ -0,0 +1,107 @@
+"""Compare peak memory of the `scrapy.Item` based Paper against the slotted dataclass Paper.
+
+The benchmark replays a CVPR + NeurIPS crawl offline: the pending detail-page requests
+and the scraped papers are rebuilt from an existing output CSV (`-csv`), or synthesized
+with CVPR/NeurIPS-sized volumes when no CSV is given. Every paper then goes through
+CrawlPipeline (without OpenAlex calls), and the peak RSS of each variant is measured in
+its own process.
+
+    python bench_memory.py -years 2019,2020,2021,2022,2023
+    python bench_memory.py -csv previous_cvpr_nips_run.csv
+"""
+import argparse
+import csv
+import random
+import resource
+import subprocess
+import sys
+
+# Accepted papers per year, roughly what CVF open access and papers.nips.cc list.
+VOLUMES = {
+    "CVPR": {"2019": 1294, "2020": 1467, "2021": 1660, "2022": 2074, "2023": 2359},
+    "NIPS": {"2019": 1428, "2020": 1898, "2021": 2334, "2022": 2671, "2023": 3540},
+}
+
+
+def synthesize(years):
+    rng = random.Random(0)
+    words = ["learning", "neural", "visual", "graph", "diffusion", "transformer", "emotion", "relation",
+             "robust", "efficient", "scene", "video", "generative", "representation", "self-supervised"]
+    for venue, volumes in VOLUMES.items():
+        for year in years:
+            for i in range(volumes.get(year, 2000)):
+                title = " ".join(rng.choice(words) for _ in range(rng.randint(6, 12))).title()
+                yield {
+                    "conf": venue + year,
+                    "title": title,
+                    "authors": ",".join("Author {}".format(rng.randint(0, 99999)) for _ in range(rng.randint(2, 8))),
+                    "abstract": " ".join(rng.choice(words) for _ in range(rng.randint(150, 250))),
+                    "pdf_url": "https://openaccess.thecvf.com/content/{}{}/papers/{}.pdf".format(venue, year, i),
+                }
+
+
+def load_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield {key: row.get(key, "") for key in ("conf", "title", "authors", "abstract", "pdf_url")}
+
+
+def run_variant(variant, rows, queries):
+    import scrapy
+    from crawl_conf.items import Paper
+    from crawl_conf.pipelines import CrawlPipeline
+    from crawl_conf.spiders.spiders import CvprScrapySpider
+    from scrapy.exceptions import DropItem
+
+    if variant == "item":
+        # The Paper definition before it became a slotted dataclass.
+        class Paper(scrapy.Item):
+            conf = scrapy.Field()
+            title = scrapy.Field()
+            authors = scrapy.Field()
+            abstract = scrapy.Field()
+            code_url = scrapy.Field()
+            citation_count = scrapy.Field()
+            matched_queries = scrapy.Field()
+            pdf_url = scrapy.Field()
+            categories = scrapy.Field()
+            concepts = scrapy.Field()
+            doi = scrapy.Field()
+
+    spider = CvprScrapySpider(years="2023", queries=queries, nocrossref=True)
+    pipeline = CrawlPipeline()
+
+    # What a crawl holds at its peak: the queued paper requests and the papers being processed.
+    requests = []
+    papers = []
+    for row in rows:
+        requests.append(scrapy.Request(row["pdf_url"].replace(".pdf", ".html"), meta={"conf": row["conf"]}))
+        paper = Paper()
+        for key, value in row.items():
+            paper[key] = value
+        try:
+            papers.append(pipeline.process_item(paper, spider))
+        except DropItem:
+            pass
+
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print("{:6s} papers={:7d} kept={:7d} peak_rss={:8.1f} MiB".format(variant, len(requests), len(papers), rss_kb / 1024))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Peak-memory benchmark of the Paper item.')
+    parser.add_argument('-csv', default=None, type=str, help='Replay the papers of an existing output file')
+    parser.add_argument('-years', default="2019,2020,2021,2022,2023", type=str, help='Years to synthesize when no CSV is given')
+    parser.add_argument('-queries', default="", type=str, help='Query evaluated by CrawlPipeline')
+    parser.add_argument('--variant', default=None, choices=["item", "slots"], help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.variant is None:
+        # Each variant runs in a fresh process, so that ru_maxrss is its own peak.
+        for variant in ("item", "slots"):
+            subprocess.run([sys.executable, __file__, "--variant", variant] + sys.argv[1:], check=True)
+    else:
+        rows = load_csv(args.csv) if args.csv else synthesize(args.years.split(","))
+        run_variant(args.variant, rows, args.queries)
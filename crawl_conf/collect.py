@@ -0,0 +1,34 @@
+"""Gather the papers pushed by the nodes of a distributed crawl into one CSV file.
+
+    python collect.py -distributed redis://host:6379/0 -out all.csv
+
+Can be run while the nodes are still crawling, every run appends what was pushed since the last one.
+With -follow, keeps polling until interrupted.
+"""
+import argparse
+import time
+
+from scrapy.utils.project import get_project_settings
+
+from crawl_conf.distributed import drain_items, get_store
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Gather the papers of a distributed crawl.')
+    parser.add_argument('-distributed', required=True, type=str, help='The Redis url the nodes were started with')
+    parser.add_argument('-job', default='crawl_conf', type=str, help='The job name the nodes were started with')
+    parser.add_argument('-out', default='data.csv', type=str, help='The CSV file to append the papers to')
+    parser.add_argument('-follow', action='store_true', help='Keep polling for new papers every few seconds')
+
+    args = parser.parse_args()
+
+    store = get_store(args.distributed)
+    fields = get_project_settings().getlist('FEED_EXPORT_FIELDS')
+
+    while True:
+        count = drain_items(store, args.job, args.out, fields)
+        print("{} papers appended to {}".format(count, args.out))
+        if not args.follow:
+            break
+        time.sleep(5)
@@ -0,0 +1,85 @@
+import re
+import unicodedata
+
+# LaTeX accent commands and the combining character they stand for: \"{o} -> ö, \'e -> é, \c{c} -> ç
+ACCENTS = {
+    "'": "\u0301", '"': "\u0308", "`": "\u0300", "^": "\u0302", "~": "\u0303", "=": "\u0304",
+    ".": "\u0307", "u": "\u0306", "v": "\u030c", "H": "\u030b", "r": "\u030a", "c": "\u0327",
+}
+ACCENT_RE = re.compile(r"\\(['\"`^~=.]|[uvHrc](?=[{\s]))\s*\{?\\?([A-Za-z])\}?")
+LETTERS = {r"\ss": "ß", r"\o": "ø", r"\O": "Ø", r"\ae": "æ", r"\AE": "Æ", r"\l": "ł", r"\L": "Ł", r"\i": "i", r"\&": "&", r"\%": "%", r"\_": "_"}
+LETTER_RE = re.compile(r"\{?(" + "|".join(re.escape(k) for k in LETTERS) + r")(?![A-Za-z])\}?")
+FIELD_RE = re.compile(r"\s*(\w+)\s*=\s*")
+ENTRY_RE = re.compile(r"@(\w+)\s*\{\s*([^,\s]*)\s*,")
+
+
+def latex_to_text(value):
+    # Good enough for titles, author names and abstracts: accents, escaped characters and the
+    # braces protecting capitals ("{B}ayesian") are resolved, math ($...$) is left as is.
+    parts = re.split(r"(\$[^$]*\$)", value)
+    for k in range(0, len(parts), 2):  # the odd parts are the math
+        part = ACCENT_RE.sub(lambda m: unicodedata.normalize("NFC", m.group(2) + ACCENTS[m.group(1)]), parts[k])
+        part = LETTER_RE.sub(lambda m: LETTERS[m.group(1)], part)
+        parts[k] = re.sub(r"(?<!\\)[{}]", "", part)
+    return " ".join("".join(parts).split())
+
+
+def _read_value(text, i):
+    # A field value is {balanced braces}, "quoted" or a bare word/number. Returns (value, end).
+    if text[i] == "{":
+        depth = 0
+        for j in range(i, len(text)):
+            if text[j] == "{" and text[j - 1] != "\\":
+                depth += 1
+            elif text[j] == "}" and text[j - 1] != "\\":
+                depth -= 1
+                if depth == 0:
+                    return text[i + 1:j], j + 1
+        return text[i + 1:], len(text)
+    if text[i] == '"':
+        j = i + 1
+        while j < len(text) and not (text[j] == '"' and text[j - 1] != "\\"):
+            j += 1
+        return text[i + 1:j], j + 1
+    match = re.compile(r"[^,}\s]*").match(text, i)
+    return match.group(0), match.end()
+
+
+def parse_bibtex(text):
+    """Parse the entries of a .bib file into dicts of lowercase field name -> raw (LaTeX) value.
+
+    Each dict also has "ENTRYTYPE" and "ID". Only what the proceedings exports we read need
+    (PMLR's bibliography.bib) is supported: no @string macros or # concatenation.
+    """
+    entries = []
+    for match in ENTRY_RE.finditer(text):
+        if match.group(1).lower() in ("comment", "string", "preamble"):
+            continue
+        entry = {"ENTRYTYPE": match.group(1).lower(), "ID": match.group(2)}
+        i = match.end()
+        while True:
+            field = FIELD_RE.match(text, i)
+            if field is None:
+                break
+            value, i = _read_value(text, field.end())
+            entry[field.group(1).lower()] = value
+            # Skip to the next field, or stop at the closing brace of the entry.
+            while i < len(text) and text[i] in " \t\r\n":
+                i += 1
+            if i >= len(text) or text[i] != ",":
+                break
+            i += 1
+        entries.append(entry)
+    return entries
+
+
+def bibtex_authors(value):
+    # "Doe, Jane and van Dam, Jan" -> ["Jane Doe", "Jan van Dam"]
+    authors = []
+    for name in re.split(r"\s+and\s+", latex_to_text(value)):
+        if "," in name:
+            last, first = name.split(",", 1)
+            name = first.strip() + " " + last.strip()
+        if name.strip():
+            authors.append(name.strip())
+    return authors
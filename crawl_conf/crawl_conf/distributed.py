@@ -0,0 +1,279 @@
+import csv
+import json
+import os
+import threading
+import time
+
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+
+# Stores opened with a memory:// url, shared by every crawler of this process.
+_MEMORY_STORES = {}
+
+
+def _bytes(value):
+    # Redis hands back bytes whatever was stored, the fake does the same.
+    return value.encode("utf-8") if isinstance(value, str) else value
+
+
+def _latin1(value):
+    # Bytes as a str any byte survives the round trip through, and back.
+    return value.decode("latin-1") if isinstance(value, bytes) else value.encode("latin-1")
+
+
+def encode_request(request_dict):
+    # A request as JSON: the queue is read by every node, so it must not be able to carry code
+    # (as a pickle would). Body and headers are bytes, stored as latin-1 strings.
+    data = dict(request_dict)
+    data["body"] = _latin1(data["body"])
+    data["headers"] = {_latin1(name): [_latin1(value) for value in values]
+                       for name, values in data["headers"].items()}
+    return json.dumps(data)
+
+
+def decode_request(data):
+    request_dict = json.loads(data)
+    request_dict["body"] = _latin1(request_dict["body"])
+    request_dict["headers"] = {_latin1(name): [_latin1(value) for value in values]
+                               for name, values in request_dict["headers"].items()}
+    return request_dict
+
+
+def job_keys(job, spider_names):
+    # Every key a job uses in the store.
+    keys = ["{}:items".format(job)]
+    for name in spider_names:
+        keys.extend("{}:{}:{}".format(job, name, suffix) for suffix in ("requests", "seen", "seeded"))
+    return keys
+
+
+class MemoryStore:
+    """In-process stand-in for the few Redis commands the distributed mode uses.
+
+    Lets several crawlers of one process share a frontier (e.g. `-distributed memory:// -nodes 2`)
+    without a Redis server. Thread-safe, nothing is persisted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.data = {}
+        self.expires = {}  # key -> time.monotonic() deadline
+
+    def _purge(self):
+        # Called with the lock held: drops the keys past their deadline.
+        now = time.monotonic()
+        for key in [key for key, deadline in self.expires.items() if deadline <= now]:
+            self.data.pop(key, None)
+            del self.expires[key]
+
+    def set(self, key, value, nx=False, ex=None):
+        with self.lock:
+            self._purge()
+            if nx and key in self.data:
+                return None
+            self.data[key] = _bytes(value)
+            if ex:
+                self.expires[key] = time.monotonic() + ex
+            return True
+
+    def expire(self, key, seconds):
+        with self.lock:
+            self._purge()
+            if key not in self.data:
+                return False
+            self.expires[key] = time.monotonic() + seconds
+            return True
+
+    def delete(self, *keys):
+        with self.lock:
+            for key in keys:
+                self.expires.pop(key, None)
+            return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def sadd(self, key, *members):
+        with self.lock:
+            self._purge()
+            members_set = self.data.setdefault(key, set())
+            before = len(members_set)
+            members_set.update(_bytes(member) for member in members)
+            return len(members_set) - before
+
+    def scard(self, key):
+        with self.lock:
+            self._purge()
+            return len(self.data.get(key, ()))
+
+    def zadd(self, key, mapping):
+        with self.lock:
+            self._purge()
+            zset = self.data.setdefault(key, {})
+            added = 0
+            for member, score in mapping.items():
+                member = _bytes(member)
+                added += member not in zset
+                zset[member] = score
+            return added
+
+    def zpopmin(self, key, count=1):
+        with self.lock:
+            self._purge()
+            zset = self.data.get(key, {})
+            popped = sorted(zset.items(), key=lambda entry: (entry[1], entry[0]))[:count]
+            for member, _ in popped:
+                del zset[member]
+            return popped
+
+    def zcard(self, key):
+        with self.lock:
+            self._purge()
+            return len(self.data.get(key, ()))
+
+    def rpush(self, key, *values):
+        with self.lock:
+            self._purge()
+            values_list = self.data.setdefault(key, [])
+            values_list.extend(_bytes(value) for value in values)
+            return len(values_list)
+
+    def lpop(self, key):
+        with self.lock:
+            self._purge()
+            values_list = self.data.get(key)
+            return values_list.pop(0) if values_list else None
+
+    def llen(self, key):
+        with self.lock:
+            self._purge()
+            return len(self.data.get(key, ()))
+
+
+def get_store(url):
+    # "memory://<name>" for the in-process fake, anything else is handed to redis-py.
+    if url.startswith("memory://"):
+        return _MEMORY_STORES.setdefault(url, MemoryStore())
+
+    import redis
+    return redis.Redis.from_url(url)
+
+
+def store_from_settings(settings):
+    return get_store(settings.get("DISTRIBUTED_URL")), settings.get("DISTRIBUTED_JOB", "crawl_conf")
+
+
+class DistributedScheduler:
+    """Scheduler whose queue and seen fingerprints live in a shared store.
+
+    Every node running the same spider (same -confs/-years/-queries, same DISTRIBUTED_JOB) pushes
+    and pops the requests of one sorted set, scored by -priority so `FrontierMiddleware` keeps
+    working, and filters duplicates against one fingerprint set. Requests are stored as JSON
+    through `Request.to_dict`, so callbacks must be spider methods and meta plain data.
+
+    The keys of the job expire DISTRIBUTED_TTL seconds after its last activity, so the same
+    DISTRIBUTED_JOB name can be used again later (or at once with `main.py --reset`).
+
+    A node whose queue is empty does not stop right away, another node may still be parsing a
+    listing page: the spider is kept open until the queue has stayed empty for
+    DISTRIBUTED_IDLE_TIMEOUT seconds.
+    """
+
+    def __init__(self, crawler, store, job, idle_timeout, ttl):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.store = store
+        self.job = job
+        self.idle_timeout = idle_timeout
+        self.ttl = ttl
+        self.spider = None
+        self.last_busy = time.monotonic()
+        self.refreshed = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        store, job = store_from_settings(crawler.settings)
+        settings = crawler.settings
+        scheduler = cls(crawler, store, job, settings.getfloat("DISTRIBUTED_IDLE_TIMEOUT", 30),
+                        settings.getint("DISTRIBUTED_TTL", 0))
+        crawler.signals.connect(scheduler.spider_idle, signal=signals.spider_idle)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        self.queue_key = "{}:{}:requests".format(self.job, spider.name)
+        self.seen_key = "{}:{}:seen".format(self.job, spider.name)
+        self.last_busy = time.monotonic()
+        self.refresh()
+
+    def close(self, reason):
+        self.refresh(force=True)
+
+    def refresh(self, force=False):
+        # Push back the expiry of the job's keys, at most once a minute.
+        if not self.ttl:
+            return
+        now = time.monotonic()
+        if not force and self.refreshed is not None and now - self.refreshed < 60:
+            return
+        self.refreshed = now
+        for key in job_keys(self.job, [self.spider.name]):
+            self.store.expire(key, self.ttl)
+
+    def request_seen(self, request):
+        fingerprint = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        return self.store.sadd(self.seen_key, fingerprint) == 0
+
+    def enqueue_request(self, request):
+        if not request.dont_filter and self.request_seen(request):
+            self.stats.inc_value("scheduler/filtered/distributed")
+            return False
+        self.store.zadd(self.queue_key, {encode_request(request.to_dict(spider=self.spider)): -request.priority})
+        self.refresh()
+        self.stats.inc_value("scheduler/enqueued/distributed")
+        self.stats.inc_value("scheduler/enqueued")
+        return True
+
+    def next_request(self):
+        popped = self.store.zpopmin(self.queue_key)
+        if not popped:
+            return None
+        self.last_busy = time.monotonic()
+        self.stats.inc_value("scheduler/dequeued/distributed")
+        self.stats.inc_value("scheduler/dequeued")
+        return request_from_dict(decode_request(popped[0][0]), spider=self.spider)
+
+    def has_pending_requests(self):
+        return self.store.zcard(self.queue_key) > 0
+
+    def __len__(self):
+        return self.store.zcard(self.queue_key)
+
+    def spider_idle(self, spider):
+        if time.monotonic() - self.last_busy < self.idle_timeout:
+            raise DontCloseSpider
+
+
+def reset_job(store, job, spider_names):
+    # Forget the queue, the seen requests and the papers not collected yet of a job.
+    return store.delete(*job_keys(job, spider_names))
+
+
+def drain_items(store, job, path, fields=None):
+    # Pop every item the nodes pushed so far and append them to a CSV file.
+    key = "{}:items".format(job)
+    new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+    count = 0
+    with open(path, "a", newline="", encoding="utf-8") as f:
+        writer = None
+        while True:
+            data = store.lpop(key)
+            if data is None:
+                break
+            item = json.loads(data)
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=fields or list(item), extrasaction="ignore")
+                if new_file:
+                    writer.writeheader()
+            # Lists (code_url, authors, categories...) are joined as the feed exporter does.
+            writer.writerow({k: ",".join(v) if isinstance(v, list) else v for k, v in item.items()})
+            count += 1
+    return count
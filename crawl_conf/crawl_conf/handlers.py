@@ -0,0 +1,67 @@
+# Download handlers, see https://docs.scrapy.org/en/latest/topics/download-handlers.html
+
+from scrapy.core.downloader.handlers.base import BaseDownloadHandler
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.httpobj import urlparse_cached
+
+
+class Http2HostsDownloadHandler(BaseDownloadHandler):
+    """HTTPS handler speaking HTTP/2 to the hosts listed in HTTP2_HOSTS, HTTP/1.1 to the others.
+
+    The OpenReview APIs answer many small requests from a single host, which
+    HTTP/2 multiplexes over one connection instead of opening a connection per concurrent
+    request. The conference websites stay on Scrapy's default HTTP/1.1 handler. Enabled by
+    `main.py --http2`, needs the h2 package (`pip install Twisted[http2]`).
+    """
+
+    lazy = False
+
+    def __init__(self, crawler):
+        # Imported here so that h2 is only needed when the handler is enabled.
+        from scrapy.core.downloader.handlers.http2 import H2DownloadHandler
+
+        super().__init__(crawler)
+        self.hosts = {host.strip().lower() for host in crawler.settings.getlist("HTTP2_HOSTS")}
+        self.http11 = HTTP11DownloadHandler.from_crawler(crawler)
+        self.http2 = H2DownloadHandler.from_crawler(crawler)
+
+    async def download_request(self, request):
+        if urlparse_cached(request).hostname in self.hosts:
+            return await self.http2.download_request(request)
+        return await self.http11.download_request(request)
+
+    async def close(self):
+        await self.http11.close()
+        await self.http2.close()
+
+
+class MockSiteDownloadHandler(BaseDownloadHandler):
+    """HTTP(S) handler sending every request to the local copy of the websites (`mocksite.py`).
+
+    https://dblp.org/db/conf/aaai/index.html is fetched from MOCK_SITE_URL/dblp.org/db/conf/aaai/index.html,
+    and the response gets the original url back, so the spiders, the middlewares and the per-host
+    limits see the real hosts. Enabled by `main.py -mocksite` and `loadtest.py`.
+    """
+
+    lazy = False
+
+    def __init__(self, crawler):
+        base_url = crawler.settings.get("MOCK_SITE_URL")
+        if not base_url:
+            raise NotConfigured("MOCK_SITE_URL is not set")
+        super().__init__(crawler)
+        self.base_url = base_url.rstrip("/")
+        self.http11 = HTTP11DownloadHandler.from_crawler(crawler)
+
+    def mock_url(self, request):
+        parsed = urlparse_cached(request)
+        url = "{}/{}{}".format(self.base_url, parsed.netloc, parsed.path or "/")
+        return url + "?" + parsed.query if parsed.query else url
+
+    async def download_request(self, request):
+        response = await self.http11.download_request(request.replace(url=self.mock_url(request)))
+        return response.replace(url=request.url)
+
+    async def close(self):
+        await self.http11.close()
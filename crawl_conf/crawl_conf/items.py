@@ -3,19 +3,42 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/items.html
 
-from scrapy import Field, Item
+from dataclasses import dataclass
 
 
-class Paper(Item):
+# A slotted dataclass instead of a scrapy.Item: no per-instance dict, and a full crawl keeps
+# tens of thousands of these in flight. Scrapy and the feed exporters handle dataclasses
+# through itemadapter, and the item["field"] access used by the spiders and pipelines still works.
+@dataclass(slots=True)
+class Paper:
 
-    conf = Field()  # The conference name for the current paper
-    title = Field()
-    authors = Field()
-    abstract = Field()
-    code_url = Field()
-    citation_count = Field() # The number of citations.
-    matched_queries = Field() # The matched queries.
-    pdf_url = Field()  # The PDF url for the paper.
-    categories = Field()
-    concepts = Field()
-    doi = Field()
+    conf: str = None  # The conference name for the current paper
+    title: str = None
+    authors: tuple = None  # The author names, or the site's own string when it only gives one.
+    abstract: str = None
+    code_url: list = None
+    citation_count: int = None # The number of citations.
+    matched_queries: tuple = None # The matched queries.
+    labels: tuple = None # The labels of the matched queries, in subscription mode (-queryfile).
+    pdf_url: str = None  # The PDF url for the paper.
+    pdf_path: str = None  # Where the PDF was stored, when downloaded (-pdfdir).
+    detail_url: str = None  # The paper page, for papers taken from a listing page (--no-abstract).
+    categories: tuple = None
+    concepts: tuple = None
+    doi: str = None
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError("Paper does not support field: {}".format(key))
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None)
+        return default if value is None else value
@@ -0,0 +1,132 @@
+import json
+import logging
+import time
+from collections import Counter, defaultdict
+
+from itemadapter import ItemAdapter
+from scrapy import signals
+from scrapy.logformatter import LogFormatter
+
+
+def _describe(item):
+    adapter = ItemAdapter(item)
+    return adapter.get("conf"), adapter.get("title")
+
+
+class CompactLogFormatter(LogFormatter):
+    """Log formatter that never renders whole items.
+
+    Scrapy's default logs every scraped item in full (abstract included) at DEBUG, and every
+    dropped item in full at WARNING: with selective queries, most of the papers crawled. Here a
+    dropped paper is one DEBUG line with its venue and the reason, and only one scraped paper in
+    LOG_ITEM_SAMPLE is logged, at INFO, by venue and title. `VenueStatsExtension` keeps the counts.
+    """
+
+    def __init__(self, sample):
+        self.sample = sample
+        self.scraped_count = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getint("LOG_ITEM_SAMPLE", 1000))
+
+    def scraped(self, item, response, spider):
+        self.scraped_count += 1
+        if not self.sample or (self.scraped_count - 1) % self.sample:
+            return None
+        conf, title = _describe(item)
+        return {
+            "level": logging.INFO,
+            "msg": "Scraped paper #%(count)d from %(conf)s: %(title)s",
+            "args": {"count": self.scraped_count, "conf": conf, "title": title},
+        }
+
+    def dropped(self, item, exception, response, spider):
+        conf, _ = _describe(item)
+        return {
+            "level": logging.DEBUG,
+            "msg": "Dropped a paper from %(conf)s: %(exception)s",
+            "args": {"conf": conf, "exception": exception},
+        }
+
+    def item_error(self, item, exception, response, spider):
+        conf, title = _describe(item)
+        return {
+            "level": logging.ERROR,
+            "msg": "Error processing a paper from %(conf)s: %(title)s",
+            "args": {"conf": conf, "title": title},
+        }
+
+
+class JsonLogFormatter(logging.Formatter):
+    # One JSON object per record, for log collectors. Structured data passed as
+    # `extra={"data": {...}}` is kept as is.
+
+    def format(self, record):
+        entry = {
+            "time": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        spider = getattr(record, "spider", None)
+        if spider is not None:
+            entry["spider"] = spider.name
+        data = getattr(record, "data", None)
+        if data is not None:
+            entry["data"] = data
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class VenueStatsExtension:
+    """Count the papers kept and dropped per conference-year, and log them when the spider closes.
+
+    The counts go to the crawl stats ("venue/CVPR2023/scraped", "venue/CVPR2023/dropped") and to
+    one summary line, also written as structured data to the JSON log (LOG_JSON_FILE) if any.
+    """
+
+    json_handler = None  # one JSON log file for all the crawlers of the process
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.counts = defaultdict(Counter)
+        self.started = time.monotonic()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        extension = cls(crawler)
+        crawler.signals.connect(extension.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(extension.item_dropped, signal=signals.item_dropped)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+
+        path = crawler.settings.get("LOG_JSON_FILE")
+        if path and VenueStatsExtension.json_handler is None:
+            handler = logging.FileHandler(path, encoding="utf-8")
+            handler.setLevel(crawler.settings.get("LOG_JSON_LEVEL", "INFO"))
+            handler.setFormatter(JsonLogFormatter())
+            logging.getLogger().addHandler(handler)
+            VenueStatsExtension.json_handler = handler
+        return extension
+
+    def count(self, item, outcome):
+        conf = ItemAdapter(item).get("conf")
+        self.counts[conf][outcome] += 1
+        self.crawler.stats.inc_value("venue/{}/{}".format(conf, outcome))
+
+    def item_scraped(self, item, spider):
+        self.count(item, "scraped")
+
+    def item_dropped(self, item, spider, exception):
+        self.count(item, "dropped")
+
+    def spider_closed(self, spider):
+        if not self.counts:
+            return
+        venues = {conf: dict(counts) for conf, counts in sorted(self.counts.items(), key=lambda entry: str(entry[0]))}
+        spider.logger.info(
+            "Papers kept/dropped per venue in %.0f s: %s", time.monotonic() - self.started,
+            ", ".join("{} {}/{}".format(conf, counts.get("scraped", 0), counts.get("dropped", 0))
+                      for conf, counts in venues.items()),
+            extra={"data": {"venues": venues}})
@@ -3,7 +3,18 @@
 # See documentation in:
 # https://docs.scrapy.org/en/latest/topics/spider-middleware.html
 
-from scrapy import signals
+import os
+import time
+from collections import OrderedDict
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.defer import maybe_deferred_to_future
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet import defer, reactor, task
+
+from .plan import CrawlPlan
+from .quarantine import load_record, load_records, record_to_response, save_response
 
 # useful for handling different item types with a single interface
 from itemadapter import is_item, ItemAdapter
@@ -101,3 +112,347 @@ class CrawlConfDownloaderMiddleware:
 
     def spider_opened(self, spider):
         spider.logger.info('Spider opened: %s' % spider.name)
+
+
+class FrontierMiddleware:
+    """Expand listing pages before detail pages, and switch to draining detail pages once the queue is long.
+
+    Each spider declares `callback_priorities`, e.g. {"parse_day": 30, "parse_paper_list": 20, "parse_paper": 0}.
+    Requests yielded with the default priority get the priority of their callback, so the
+    scheduler finishes discovering work before fetching papers. Once more than
+    FRONTIER_MAX_PENDING requests are queued, new detail requests (priority 0) are put ahead of
+    everything else instead, so the queue drains before more listing pages are expanded. This
+    only reorders requests: nothing is dropped, and the queue may still grow past the threshold.
+    """
+
+    def __init__(self, stats, max_pending):
+        self.stats = stats
+        self.max_pending = max_pending
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.stats, crawler.settings.getint("FRONTIER_MAX_PENDING", 2000))
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            if isinstance(r, Request):
+                self.prioritize(r, spider)
+            yield r
+
+    async def process_spider_output_async(self, response, result, spider):
+        # Scrapy >= 2.13 refuses middlewares without an asynchronous variant.
+        async for r in result:
+            if isinstance(r, Request):
+                self.prioritize(r, spider)
+            yield r
+
+    def prioritize(self, request, spider):
+        priorities = getattr(spider, "callback_priorities", {})
+        callback = getattr(request.callback, "__name__", None)
+
+        # Leave alone the priorities set explicitly by the spider.
+        if request.priority != 0 or callback not in priorities:
+            return
+
+        priority = priorities[callback]
+        if priority == 0 and self.pending() > self.max_pending:
+            priority = max(priorities.values()) + 1
+        request.priority = priority
+
+    def pending(self):
+        return self.stats.get_value("scheduler/enqueued", 0) - self.stats.get_value("scheduler/dequeued", 0)
+
+
+class DistributedSeedMiddleware:
+    """In distributed mode, let only the first node that opens a spider schedule its start urls.
+
+    Start requests are `dont_filter`, so the shared fingerprint set would not stop every node
+    from crawling the listing pages again. The other nodes start with nothing and pull their
+    work from the shared queue (see `DistributedScheduler`).
+    """
+
+    def __init__(self, crawler, store, job, ttl):
+        self.crawler = crawler
+        self.store = store
+        self.job = job
+        self.ttl = ttl
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.get("DISTRIBUTED_URL"):
+            raise NotConfigured
+        from .distributed import store_from_settings
+        store, job = store_from_settings(crawler.settings)
+        return cls(crawler, store, job, crawler.settings.getint("DISTRIBUTED_TTL", 0))
+
+    def is_seeder(self, spider):
+        key = "{}:{}:seeded".format(self.job, spider.name)
+        return bool(self.store.set(key, 1, nx=True, ex=self.ttl or None))
+
+    async def process_start(self, start):
+        seeder = self.is_seeder(self.crawler.spider)
+        async for r in start:
+            if seeder or not isinstance(r, Request):
+                yield r
+
+    def process_start_requests(self, start_requests, spider):
+        # Scrapy < 2.13
+        seeder = self.is_seeder(spider)
+        for r in start_requests:
+            if seeder or not isinstance(r, Request):
+                yield r
+
+
+class CoalescingMiddleware:
+    """Share downloads between all the spiders of the process, and be polite per host across them.
+
+    `main.py` runs many spiders in one CrawlerProcess, and several fetch the same pages: CVPR
+    and ICCV both read the CVF menu, and the dblp spiders share dblp.org. Each crawler has its
+    own downloader, so by default neither the requests nor the per-host limits are shared.
+
+    - A GET for a URL another spider is already downloading waits for that download and gets
+      the same response. The last COALESCE_CACHE_SIZE responses up to COALESCE_MAX_BYTES are
+      also kept, for spiders asking a bit later.
+    - At most GLOBAL_CONCURRENT_REQUESTS_PER_HOST requests are sent to one host at a time, and
+      GLOBAL_DOWNLOAD_DELAY seconds apart, whatever spider sends them.
+
+    It sits right before the download handler, so cache, retry and redirect middlewares see
+    coalesced responses like any other.
+    """
+
+    # Shared by the middlewares of all the crawlers of the process.
+    inflight = {}  # fingerprint -> Deferreds waiting for the response
+    cache = OrderedDict()  # fingerprint -> Response
+    semaphores = {}  # host -> DeferredSemaphore
+    next_slot = {}  # host -> earliest time of the next request
+
+    def __init__(self, crawler, cache_size, max_bytes, per_host, delay):
+        self.crawler = crawler
+        self.cache_size = cache_size
+        self.max_bytes = max_bytes
+        self.per_host = per_host
+        self.delay = delay
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("COALESCE_ENABLED", True):
+            raise NotConfigured
+        return cls(
+            crawler,
+            cache_size=settings.getint("COALESCE_CACHE_SIZE", 64),
+            max_bytes=settings.getint("COALESCE_MAX_BYTES", 1024 * 1024),
+            per_host=settings.getint("GLOBAL_CONCURRENT_REQUESTS_PER_HOST", 8),
+            delay=settings.getfloat("GLOBAL_DOWNLOAD_DELAY", 0),
+        )
+
+    def fingerprint(self, request):
+        # Only plain GETs are shared: not POSTs (the ACM export), nor Range requests (resumed PDFs).
+        if request.method != "GET" or b"Range" in request.headers or not request.meta.get("coalesce", True):
+            return None
+        return self.crawler.request_fingerprinter.fingerprint(request)
+
+    async def process_request(self, request, spider=None):
+        key = self.fingerprint(request)
+        if key is not None:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.crawler.stats.inc_value("coalesce/cached")
+                return self.cache[key].replace(request=request)
+            if key in self.inflight:
+                waiting = defer.Deferred()
+                self.inflight[key].append(waiting)
+                response = await maybe_deferred_to_future(waiting)
+                if response is not None:
+                    self.crawler.stats.inc_value("coalesce/shared")
+                    return response.replace(request=request)
+                # The download we waited for failed, try on our own.
+            self.inflight.setdefault(key, [])
+            request.meta["_coalesce_key"] = key
+
+        # Global politeness: the slot is released in process_response / process_exception.
+        host = urlparse_cached(request).hostname
+        if host not in self.semaphores:
+            self.semaphores[host] = defer.DeferredSemaphore(self.per_host)
+        await maybe_deferred_to_future(self.semaphores[host].acquire())
+        request.meta["_coalesce_host"] = host
+        if self.delay:
+            now = time.monotonic()
+            slot = max(self.next_slot.get(host, now), now)
+            self.next_slot[host] = slot + self.delay
+            if slot > now:
+                await maybe_deferred_to_future(task.deferLater(reactor, slot - now))
+        return None
+
+    def process_response(self, request, response, spider=None):
+        self.release(request)
+        key = request.meta.pop("_coalesce_key", None)
+        if key is not None:
+            if response.status == 200 and len(response.body) <= self.max_bytes:
+                self.cache[key] = response
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+            self.resolve(key, response if response.status == 200 else None)
+        return response
+
+    def process_exception(self, request, exception, spider=None):
+        self.release(request)
+        key = request.meta.pop("_coalesce_key", None)
+        if key is not None:
+            self.resolve(key, None)
+        return None
+
+    def release(self, request):
+        host = request.meta.pop("_coalesce_host", None)
+        if host is not None:
+            self.semaphores[host].release()
+
+    def resolve(self, key, response):
+        for waiting in self.inflight.pop(key, []):
+            waiting.callback(response)
+
+
+class QuarantineMiddleware:
+    """Keep the responses whose callback raised, so the papers can be recovered without re-crawling.
+
+    When a site changes its markup, `extract_data` fails on every page of it. The body, headers
+    and meta of each such response are stored gzipped in QUARANTINE_DIR (see `quarantine.py`).
+    Once the spider is fixed, `python replay.py` runs the callbacks again on them.
+    """
+
+    def __init__(self, crawler, directory):
+        self.crawler = crawler
+        self.directory = directory
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("QUARANTINE_DIR")
+        if not directory:
+            raise NotConfigured
+        return cls(crawler, directory)
+
+    def process_spider_exception(self, response, exception, spider=None):
+        spider = spider or self.crawler.spider
+        path = save_response(self.directory, response, spider, exception)
+        self.crawler.stats.inc_value("quarantine/saved")
+        spider.logger.warning("Quarantined %s (%s: %s) to %s", response.url, type(exception).__name__, exception, path)
+        # Let Scrapy log the error as usual.
+        return None
+
+
+class QuarantineReplayMiddleware:
+    """Spider middleware of `replay.py`: the spider starts from its quarantined responses.
+
+    The start urls are replaced by one request per quarantined response, to the callback that
+    failed on it. `QuarantineResponseMiddleware` answers them from the store. A record is
+    deleted once its callback went through without raising.
+    """
+
+    def __init__(self, crawler, directory):
+        self.crawler = crawler
+        self.directory = directory
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("QUARANTINE_REPLAY_DIR")
+        if not directory:
+            raise NotConfigured
+        return cls(crawler, directory)
+
+    def quarantined_requests(self, spider):
+        for path, record in load_records(self.directory, spider.name):
+            meta = dict(record["meta"], quarantine_file=path)
+            yield Request(record["url"], callback=getattr(spider, record["callback"]), meta=meta, dont_filter=True)
+
+    async def process_start(self, start):
+        for request in self.quarantined_requests(self.crawler.spider):
+            yield request
+
+    def process_start_requests(self, start_requests, spider):
+        # Scrapy < 2.13
+        yield from self.quarantined_requests(spider)
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self.recovered(response)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for r in result:
+            yield r
+        self.recovered(response)
+
+    def recovered(self, response):
+        path = response.meta.get("quarantine_file")
+        if path and os.path.exists(path):
+            os.remove(path)
+            self.crawler.stats.inc_value("quarantine/recovered")
+
+
+class QuarantineResponseMiddleware:
+    # Downloader middleware of `replay.py`: quarantined requests are answered from the store.
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.get("QUARANTINE_REPLAY_DIR"):
+            raise NotConfigured
+        return cls()
+
+    def process_request(self, request, spider=None):
+        path = request.meta.get("quarantine_file")
+        if path is None:
+            return None
+        return record_to_response(load_record(path), request)
+
+
+class PlanMiddleware:
+    """Dry run (`main.py --plan`): crawl the listing pages only, and count what the crawl would fetch.
+
+    Requests to the callbacks that build papers (`plan_callbacks`, by default `parse_paper` and
+    the ACM citation export) are counted and dropped instead of being scheduled. So are the
+    papers read from listing pages, so no OpenAlex lookup is made. The counts of all the spiders
+    go to one `CrawlPlan`, printed by `main.py` once the crawl is over.
+    """
+
+    plan = None  # shared by the spiders of the process
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        if PlanMiddleware.plan is None:
+            PlanMiddleware.plan = CrawlPlan()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("CRAWL_PLAN"):
+            raise NotConfigured
+        return cls(crawler)
+
+    def process_spider_input(self, response, spider=None):
+        host = urlparse_cached(response).hostname
+        self.plan.fetched(response.meta.get("conf"), host, response.meta.get("download_latency"))
+        return None
+
+    def process_spider_output(self, response, result, spider):
+        for r in result:
+            if not self.planned(r, spider):
+                yield r
+
+    async def process_spider_output_async(self, response, result, spider=None):
+        spider = spider or self.crawler.spider
+        async for r in result:
+            if not self.planned(r, spider):
+                yield r
+
+    def planned(self, r, spider):
+        # True if `r` was counted instead of being let through.
+        if isinstance(r, Request):
+            callback = getattr(r.callback, "__name__", None)
+            if callback not in getattr(spider, "plan_callbacks", ("parse_paper",)):
+                return False
+            dois = len(r.meta["dois"]) if "dois" in r.meta else int(bool(r.meta.get("doi")))
+            self.plan.detail(r.meta.get("conf"), urlparse_cached(r).hostname, r.meta.get("papers", 1), dois)
+            return True
+        if is_item(r):
+            adapter = ItemAdapter(r)
+            self.plan.listed(adapter.get("conf"), adapter.get("doi"))
+            return True
+        return False
@@ -0,0 +1,184 @@
+import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from .ratelimit import AdaptiveRateLimiter, request_with_retry
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # orjson is optional, the standard parser is just slower
+    loads = json.loads
+
+OPENALEX_URL = "https://api.openalex.org/works"
+
+# The fields of a work the enrichment reads. Without `select` OpenAlex sends the whole work
+# (authorships, abstract index, references, locations...), tens of kB per result.
+WORK_FIELDS = "title,doi,cited_by_count,topics,concepts"
+# The enrichment fuzzy-matches the title against the first 10 search results only.
+SEARCH_PER_PAGE = 10
+
+# OpenAlex accepts at most 50 values in one OR-filter (doi:a|b|c...).
+MAX_DOIS_PER_REQUEST = 50
+
+
+def normalize_doi(doi):
+    # DOIs come in as "10.1145/xxx", "https://doi.org/10.1145/xxx" or "doi:10.1145/xxx".
+    # OpenAlex treats them case-insensitively, so we keep the bare lowercase form.
+    if not doi:
+        return ""
+    doi = doi.strip().lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "https://dx.doi.org/", "http://dx.doi.org/", "doi:"):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi
+
+
+@dataclass(slots=True)
+class Work:
+    # An OpenAlex work, reduced to WORK_FIELDS. Topics and concepts are their display names.
+    title: str = None
+    doi: str = None
+    cited_by_count: int = -1
+    topics: tuple = ()
+    concepts: tuple = ()
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            title=data.get("title"),
+            doi=data.get("doi"),
+            cited_by_count=data.get("cited_by_count", -1),
+            topics=tuple(topic["display_name"] for topic in data.get("topics") or ()),
+            concepts=tuple(concept["display_name"] for concept in data.get("concepts") or ()),
+        )
+
+
+def parse_works(body):
+    # The body of a search / filter answer ({"results": [...]}) or of a single work.
+    data = loads(body)
+    results = data["results"] if "results" in data else [data]
+    return [Work.from_json(work) for work in results]
+
+
+class OpenAlexClient:
+    # Passing a mailto puts the requests into OpenAlex's polite pool.
+    # All the lookups share one requests.Session, whose pool keeps up to `pool_size`
+    # connections alive, so only the first lookup of each thread pays for the TCP+TLS handshake.
+
+    # Identical lookups are coalesced: a lookup already in flight in another thread (e.g. the
+    # same paper crawled by two spiders) is waited for instead of sent again, and the last
+    # `cache_size` successful answers are reused.
+
+    def __init__(self, mailto=None, rate=5.0, max_rate=10.0, max_retries=5, backoff=1.0, pool_size=10,
+                 cache_size=1024, url=OPENALEX_URL, timeout=30):
+        self.mailto = mailto
+        self.url = url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.cache_size = cache_size
+        self.limiter = AdaptiveRateLimiter(rate=rate, max_rate=max_rate)
+        self._session = None
+        self._lock = threading.Lock()
+        self._inflight = {}  # request key -> Future of the response
+        self._cache = OrderedDict()  # request key -> response
+
+    @property
+    def session(self):
+        # Built on first use, so that requests is only imported when we actually call the API.
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            mailto=settings.get("OPENALEX_MAILTO"),
+            rate=settings.getfloat("OPENALEX_RATE", 5.0),
+            max_rate=settings.getfloat("OPENALEX_MAX_RATE", 10.0),
+            max_retries=settings.getint("OPENALEX_MAX_RETRIES", 5),
+            backoff=settings.getfloat("OPENALEX_BACKOFF", 1.0),
+            # One pooled connection per lookup thread.
+            pool_size=settings.getint("REACTOR_THREADPOOL_MAXSIZE", 10),
+            cache_size=settings.getint("OPENALEX_CACHE_SIZE", 1024),
+            url=settings.get("OPENALEX_URL") or OPENALEX_URL,
+            timeout=settings.getfloat("ENRICH_TIMEOUT", 30),
+        )
+
+    def get(self, url, params=None):
+        params = dict(params or {})
+        if self.mailto:
+            params["mailto"] = self.mailto
+
+        key = (url, tuple(sorted(params.items())))
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = self._inflight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            response = request_with_retry(self.limiter, "GET", url, max_retries=self.max_retries,
+                                          backoff=self.backoff, session=self.session, params=params,
+                                          timeout=self.timeout)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+            if response is not None and response.status_code == 200 and self.cache_size:
+                self._cache[key] = response
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        future.set_result(response)
+        return response
+
+    def search_works(self, title, select=None, per_page=None):
+        # Free-text search, used when we do not know the DOI of the paper.
+        # `select` ("title,cited_by_count") restricts the fields OpenAlex sends back.
+        params = {"search": title}
+        if select:
+            params["select"] = select
+        if per_page:
+            params["per-page"] = per_page
+        return self.get(self.url, params=params)
+
+    def get_work_by_doi(self, doi, select=None):
+        # Exact lookup, a single work object is returned (or 404 if OpenAlex does not know it).
+        params = {"select": select} if select else None
+        return self.get(self.url + "/doi:" + normalize_doi(doi), params=params)
+
+    def get_works_by_dois(self, dois, select=None):
+        # Batched exact lookup. Returns a dict mapping the normalized DOI to its `Work`.
+        # DOIs unknown to OpenAlex are simply absent from the result. `select` must include "doi".
+        dois = [normalize_doi(doi) for doi in dois if doi]
+        works = {}
+        for i in range(0, len(dois), MAX_DOIS_PER_REQUEST):
+            chunk = dois[i:i + MAX_DOIS_PER_REQUEST]
+            params = {"filter": "doi:" + "|".join(chunk), "per-page": MAX_DOIS_PER_REQUEST}
+            if select:
+                params["select"] = select
+            response = self.get(self.url, params=params)
+            if response is None or response.status_code != 200:
+                continue
+            for work in parse_works(response.content):
+                works[normalize_doi(work.doi)] = work
+        return works
@@ -0,0 +1,51 @@
+import re
+
+# Code links are usually on the first page (abstract, footnotes) or at the end of the introduction.
+REPO_URL_RE = re.compile(
+    r"(?:https?://)?(?:www\.)?"
+    r"(?:github\.com|gitlab\.com|bitbucket\.org|huggingface\.co|gitee\.com|codeberg\.org|sourceforge\.net)"
+    r"/[\w\-.~%/]+",
+    re.IGNORECASE,
+)
+
+
+def extract_code_urls(path, max_pages=3):
+    """Return the repository urls found in the first `max_pages` pages of a PDF.
+
+    Runs in a worker process (see `PdfMiningPipeline`), so it must stay a picklable
+    module-level function. Needs pypdf.
+    """
+    from pypdf import PdfReader
+
+    try:
+        reader = PdfReader(path)
+        pages = reader.pages[:max_pages]
+        text = "\n".join(page.extract_text() or "" for page in pages)
+    except Exception:
+        # A broken PDF should not take the worker down, we simply find nothing in it.
+        return []
+
+    return code_urls_in_text(text)
+
+
+def code_urls_in_text(text):
+    r"""Return the repository urls of a text extracted from a PDF, in order, without duplicates.
+
+    Urls broken across lines by the layout are joined again. A line ending in "." is only joined
+    to the next one if that starts like the rest of a path, so a url ending a sentence stays whole:
+
+    >>> code_urls_in_text("Code: https://github.com/foo/\nbar-baz.\nWe train on ImageNet.")
+    ['https://github.com/foo/bar-baz']
+    >>> code_urls_in_text("at github.com/foo/my_\nrepo and https://gitlab.com/a/b.\ngit")
+    ['https://github.com/foo/my_repo', 'https://gitlab.com/a/b.git']
+    """
+    text = re.sub(r"(?<=[/\-_])\s*\n\s*|(?<=\.)\s*\n\s*(?=[a-z/_\-~%])", "", text)
+
+    urls = []
+    for match in REPO_URL_RE.findall(text):
+        url = match.rstrip(".,;:)/")
+        if not url.lower().startswith("http"):
+            url = "https://" + url
+        if url not in urls:
+            urls.append(url)
+    return urls
@@ -1,29 +1,27 @@
-import time
-import threading
+import csv
+import hashlib
+import json
+import os
 import re
-import requests
+import time
+from urllib.parse import urlparse
 
 from itemadapter import ItemAdapter
-from scrapy.exceptions import DropItem
-from fuzzywuzzy import fuzz
-from fuzzywuzzy import process
-
-OPENALEX_URL = "https://api.openalex.org/works"
+import scrapy
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.defer import deferred_from_coro
+from twisted.internet import defer, reactor, task, threads
+
+from .distributed import store_from_settings
+from .openalex import SEARCH_PER_PAGE, normalize_doi
+from .pdfmining import extract_code_urls
+from .providers import DoiBatcher, ProviderChain
+from .ranking import RankedIndex
+from .streams import StreamWriter, open_sink, paper_record
 
 # ------------- BooleanSearchParser code (unchanged) -------------
-from pyparsing import (
-    Word,
-    alphanums,
-    CaselessKeyword,
-    Group,
-    Forward,
-    Suppress,
-    OneOrMore,
-    one_of,
-    ParserElement,
-)
-
-ParserElement.enablePackrat()
+# pyparsing is only imported (and packrat enabled) when a parser is built, which does not
+# happen for runs without -queries or for the tools that never filter.
 
 alphabet_ranges = [
     [int("0400", 16), int("04FF", 16)],  # CYRILIC
@@ -58,6 +56,20 @@ class BooleanSearchParser:
         self.words = []
 
     def parser(self):
+        from pyparsing import (
+            Word,
+            alphanums,
+            CaselessKeyword,
+            Group,
+            Forward,
+            Suppress,
+            OneOrMore,
+            one_of,
+            ParserElement,
+        )
+
+        ParserElement.enablePackrat()
+
         operatorOr = Forward()
 
         alphabet = alphanums
@@ -204,18 +216,126 @@ class BooleanSearchParser:
         return found
 
 
+def read_query_file(path):
+    # One query per line, as "label: query". Empty lines and lines starting with # are skipped.
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            label, expr = line.split(":", 1)
+            queries.append((label.strip(), expr.strip()))
+    return queries
+
+
+class QuerySet:
+    """Evaluate many named queries against a title in a single pass.
+
+    Every query is parsed once. The plain words of the queries are indexed in a
+    term -> bitmap of queries dictionary, so for a title only the queries sharing at least
+    one word with it are evaluated. Queries whose result does not depend on word
+    presence alone (`not`, wildcards, quoted phrases) are evaluated for every title.
+    """
+
+    def __init__(self, queries):
+        self.parser = BooleanSearchParser()
+        self.labels = []
+        self.trees = []
+        self.term_bitmap = {}
+        self.always = 0
+
+        for i, (label, expr) in enumerate(queries):
+            tree = self.parser._parser(expr)[0]
+            self.labels.append(label)
+            self.trees.append(tree)
+
+            terms = set()
+            if self._collect_terms(tree, terms):
+                for term in terms:
+                    self.term_bitmap[term] = self.term_bitmap.get(term, 0) | (1 << i)
+            else:
+                self.always |= 1 << i
+
+    @classmethod
+    def from_file(cls, path):
+        return cls(read_query_file(path))
+
+    def _collect_terms(self, tree, terms):
+        # Returns False if the query can match a title containing none of its words.
+        name = tree.getName()
+        if name == "word":
+            if "*" in tree[0]:
+                return False
+            terms.add(tree[0])
+            return True
+        if name in ("not", "quotes"):
+            return False
+        return all(self._collect_terms(argument, terms) for argument in tree)
+
+    def match(self, text):
+        # Returns the labels of the matching queries and the union of their matched tokens.
+        parser = self.parser
+        parser.text = text
+        parser.words = parser._split_words(text)
+
+        candidates = self.always
+        for word in set(parser.words):
+            candidates |= self.term_bitmap.get(word, 0)
+
+        labels = []
+        tokens = set()
+        i = 0
+        while candidates:
+            if candidates & 1:
+                found, matched = parser.evaluate(self.trees[i])
+                if found:
+                    labels.append(self.labels[i])
+                    tokens |= matched
+            candidates >>= 1
+            i += 1
+        return labels, tokens
+
+
 # ------------------------------- NEW Code / Changes -------------------------------
-import time
-import threading
+
+def engine_download(crawler, request):
+    # Fetch a request from a pipeline, through the downloader middlewares only. Returns a Deferred.
+    engine = crawler.engine
+    if hasattr(engine, "download_async"):
+        return deferred_from_coro(engine.download_async(request))
+    return engine.download(request)
+
 
 class CrawlPipeline:
-    # These three attributes are newly added for rate-limiting:
-    rate_limit_lock = threading.Lock()
-    last_request_time = 0
-    COOLDOWN_SECONDS = 1  # Wait 1s between external requests
+    # One provider chain (and so one rate limiter per service) is shared by the pipelines of all
+    # spiders, since the APIs limit us per IP / key, not per spider. The DOI lookups of all the
+    # spiders are gathered into bulk lookups by one batcher (see `providers.py`).
+    providers = None
+    batcher = None
+
+    def __init__(self, query_file=None):
+        # Building the grammar is expensive, so one parser is reused for every item, and it
+        # is only built once a query has to be evaluated. Matching only happens in the reactor thread.
+        self._parser = None
+
+        # Subscription mode: all the named queries of the file are evaluated for every paper.
+        self.query_set = QuerySet.from_file(query_file) if query_file else None
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            self._parser = BooleanSearchParser()
+        return self._parser
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if CrawlPipeline.providers is None:
+            CrawlPipeline.providers = ProviderChain.from_settings(crawler.settings)
+            CrawlPipeline.batcher = DoiBatcher(CrawlPipeline.providers, crawler.settings.getfloat("ENRICH_BATCH_DELAY", 0.5))
+        return cls(query_file=crawler.settings.get("QUERY_FILE"))
 
     def process_item(self, item, spider):
-        parser = BooleanSearchParser()
         abstract = item["abstract"]
         title = item["title"]
 
@@ -223,64 +343,565 @@ class CrawlPipeline:
         text_body = clean_title
 
         # parse queries
-        if spider.queries == "":
+        if self.query_set is not None:
+            labels, matched_tokens = self.query_set.match(text_body)
+            found = bool(labels)
+            item["labels"] = tuple(labels)
+        elif spider.queries == "":
             found = True
             matched_tokens = set()
         else:
-            found, matched_tokens = parser.match_with_tokens(
+            found, matched_tokens = self.parser.match_with_tokens(
                 text=text_body, expr=spider.queries
             )
 
         if found:
             if not spider.from_dblp and abstract is not None:
                 item["code_url"] = re.findall(r'(https?://\S+)', abstract)
+            item["matched_queries"] = tuple(matched_tokens)
 
-            citation_count = -1
-            paper_doi = ""
-            paper_categories = ""
-            paper_concepts = ""
-
-            # Only call external API if the spider says so
+            # Only call external API if the spider says so.
+            # Papers with a DOI wait (briefly) for a bulk lookup, the others, and those whose DOI
+            # no provider knows, are searched by title. The lookups block on the network, so they
+            # run in the reactor thread pool and several can be in flight while the limiters keep
+            # us under the allowed rates.
             if spider.crossref:
-                params = {"search": clean_title}
-
-                # --- NEW: This block is now rate-limited ---
-                with self.rate_limit_lock:
-                    now = time.time()
-                    elapsed = now - self.last_request_time
-                    if elapsed < self.COOLDOWN_SECONDS:
-                        time.sleep(self.COOLDOWN_SECONDS - elapsed)
-
-                    response = requests.get(OPENALEX_URL, params=params)
-                    self.last_request_time = time.time()
-                # --- END of rate-limited block ---
-
-                if response.status_code == 200:
-                    data = response.json()
-                    if data["results"]:
-                        # Extract the top 10 papers
-                        top_papers = data["results"][:10]
-
-                        # Get the titles from the top 10 papers
-                        found_titles = [paper["title"] for paper in top_papers]
-
-                        # Find the most relevant title using fuzzy matching
-                        best_match, best_score = process.extractOne(title, found_titles, scorer=fuzz.ratio)
-
-                        # Find the corresponding paper
-                        best_paper = next(paper for paper in top_papers if paper["title"] == best_match)
-
-                        # best_paper = data["results"][0]
-                        citation_count = best_paper["cited_by_count"]
-                        paper_categories = ",".join([best_paper["topics"][i]['display_name'] for i in range(len(best_paper["topics"]))])
-                        paper_concepts = ",".join([best_paper["concepts"][i]['display_name'] for i in range(len(best_paper["concepts"]))])
-                        paper_doi = best_paper["doi"]
-
-            item["citation_count"] = citation_count
-            item["matched_queries"] = ",".join(list(matched_tokens))
-            item["categories"] = paper_categories
-            item["concepts"] = paper_concepts
-            item["doi"] = paper_doi
+                if item.get("doi"):
+                    d = self.batcher.lookup(item["doi"])
+                    d.addCallback(lambda work: work if work is not None else
+                                  threads.deferToThread(self.search, item, clean_title, spider))
+                else:
+                    d = threads.deferToThread(self.search, item, clean_title, spider)
+                d.addErrback(self.lookup_failed, item, spider)
+                return d.addCallback(lambda work: self.enrich(item, work))
+            return self.enrich(item, None)
+        else:
+            # A constant reason: most papers end here, rendering them would cost more than matching.
+            raise DropItem("No query matched the title")
+
+    def lookup_failed(self, failure, item, spider):
+        # A provider answered something we could not read: keep the paper, without enrichment.
+        spider.logger.error("Enrichment failed for %s: %s", item["title"], failure.getErrorMessage())
+        return None
+
+    def search(self, item, clean_title, spider):
+        # The best match of the title among the candidates of the first provider that has some.
+        # Runs in the thread pool; `spider` lets the profiler attribute the samples taken here.
+        candidates = self.providers.search_title(clean_title)[:SEARCH_PER_PAGE]
+        if not candidates:
+            return None
+        from fuzzywuzzy import fuzz, process
+
+        # Find the most relevant title using fuzzy matching
+        best_match, best_score = process.extractOne(item["title"], [work.title for work in candidates], scorer=fuzz.ratio)
+
+        # Find the corresponding paper
+        return next(work for work in candidates if work.title == best_match)
+
+    def enrich(self, item, work):
+        citation_count = -1
+        paper_doi = ""
+        paper_categories = ()
+        paper_concepts = ()
+
+        if work is not None:
+            citation_count = work.cited_by_count
+            # Tuples: topic names may contain commas, the CSV writers join them, the streams keep them apart.
+            paper_categories = work.topics
+            paper_concepts = work.concepts
+            paper_doi = work.doi or ""
+
+        # Keep the DOI scraped from the site if the providers did not give us one.
+        if not paper_doi and item.get("doi"):
+            paper_doi = "https://doi.org/" + normalize_doi(item["doi"])
+
+        item["citation_count"] = citation_count
+        item["categories"] = paper_categories
+        item["concepts"] = paper_concepts
+        item["doi"] = paper_doi
+        return item
+
+
+class RankingPipeline:
+    """Rank every crawled paper against the queries, as an alternative to the boolean hit-or-miss.
+
+    Runs before CrawlPipeline, so it sees the papers the boolean filter drops as well. The
+    titles and abstracts go into one BM25 index shared by all spiders. When the last spider
+    closes, the RANK_TOP_K best papers of each query are written to RANK_OUTPUT with their
+    score and the query words they contain. The queries are the ones of QUERY_FILE, or the
+    spider's -queries.
+    """
+
+    index = None
+    open_spiders = 0
+    queries = None
+
+    def __init__(self, output, top_k, query_file):
+        self.output = output
+        self.top_k = top_k
+        if query_file and RankingPipeline.queries is None:
+            RankingPipeline.queries = read_query_file(query_file)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        top_k = settings.getint("RANK_TOP_K")
+        if not top_k:
+            raise NotConfigured
+        return cls(settings.get("RANK_OUTPUT", "ranked.csv"), top_k, settings.get("QUERY_FILE"))
+
+    def open_spider(self, spider):
+        if RankingPipeline.index is None:
+            RankingPipeline.index = RankedIndex()
+        if RankingPipeline.queries is None:
+            RankingPipeline.queries = [("query", spider.queries)]
+        RankingPipeline.open_spiders += 1
+
+    def process_item(self, item, spider):
+        text = (item["title"] or "") + " " + (item["abstract"] or "")
+        self.index.add(text, (item["conf"], item["title"], item["authors"], item["pdf_url"], item.get("doi", "")))
+        return item
+
+    def close_spider(self, spider):
+        RankingPipeline.open_spiders -= 1
+        if RankingPipeline.open_spiders > 0:
+            return
+
+        index, RankingPipeline.index = RankingPipeline.index, None
+        start = time.time()
+        results = index.top_k(self.queries, self.top_k)
+        spider.logger.info("Ranked %d papers against %d queries in %.3fs", len(index), len(self.queries), time.time() - start)
+
+        with open(self.output, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["query", "rank", "score", "matched_terms", "conf", "title", "authors", "pdf_url", "doi"])
+            for label, hits in results.items():
+                for rank, ((conf, title, authors, pdf_url, doi), score, matched) in enumerate(hits, 1):
+                    if isinstance(authors, (list, tuple)):
+                        authors = ",".join(authors)
+                    writer.writerow([label, rank, "%.4f" % score, ",".join(matched), conf, title, authors, pdf_url, doi])
+
+
+class AbstractPipeline:
+    """Fetch the abstract of the papers taken from listing pages (--no-abstract), once they passed the query.
+
+    Only the papers kept by CrawlPipeline reach this stage, so a broad scan fetches the paper
+    pages of the few matches instead of all of them. The page is parsed with the spider's own
+    `extract_data`. Enabled by FETCH_ABSTRACTS.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("FETCH_ABSTRACTS"):
+            raise NotConfigured
+        return cls(crawler)
+
+    def process_item(self, item, spider):
+        if item.get("abstract") or not item.get("detail_url"):
+            return item
+
+        request = scrapy.Request(item["detail_url"], meta={"conf": item["conf"]}, dont_filter=True)
+        d = engine_download(self.crawler, request)
+        d.addCallback(self.set_abstract, item, spider)
+        d.addErrback(self.failed, item, spider)
+        return d
+
+    def set_abstract(self, response, item, spider):
+        data = spider.extract_data(response)
+        if data is None or data[3] is None:
             return item
+        abstract = data[3].replace("\n", " ")
+        item["abstract"] = abstract
+        if not spider.from_dblp:
+            item["code_url"] = re.findall(r'(https?://\S+)', abstract)
+        return item
+
+    def failed(self, failure, item, spider):
+        spider.logger.warning("Abstract fetch failed for %s: %s", item["detail_url"], failure.value)
+        return item
+
+
+class PdfDownloadPipeline:
+    """Download the PDF of every accepted paper into a content-addressed store.
+
+    Files are stored once per content as PDF_STORE/<sha256[:2]>/<sha256>.pdf, so the same PDF
+    listed by several venues takes no extra space, and the paper gets the path in `pdf_path`.
+    PDF_STORE/index.jsonl maps urls to hashes, so urls downloaded by a previous run are skipped.
+    Downloads go through Scrapy's downloader, at most PDF_CONCURRENCY_PER_HOST at a time per
+    host. A download cut short is kept in PDF_STORE/partial/ and resumed with an HTTP Range
+    request by the next attempt.
+    """
+
+    # Shared by the pipelines of all the crawlers of the process, so that two spiders reaching
+    # the same PDF download it once, and do not write to the same partial file at once.
+    semaphores = {}  # host -> DeferredSemaphore
+    index = {}  # url -> sha256
+    downloading = {}  # url -> Deferreds of the other items waiting for a download already in progress
+
+    def __init__(self, crawler, store, per_host, max_size):
+        self.crawler = crawler
+        self.store = store
+        self.per_host = per_host
+        self.max_size = max_size
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        store = settings.get("PDF_STORE")
+        if not store:
+            raise NotConfigured
+        return cls(crawler, store, settings.getint("PDF_CONCURRENCY_PER_HOST", 4), settings.getint("PDF_MAX_SIZE", 0))
+
+    def open_spider(self, spider):
+        os.makedirs(os.path.join(self.store, "partial"), exist_ok=True)
+        index_path = os.path.join(self.store, "index.jsonl")
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.index[entry["url"]] = entry["sha256"]
+
+    def process_item(self, item, spider):
+        url = item.get("pdf_url")
+        if not url:
+            return item
+
+        sha256 = self.index.get(url)
+        if sha256 is not None and os.path.exists(self.path_for(sha256)):
+            item["pdf_path"] = self.path_for(sha256)
+            return item
+
+        if url in self.downloading:
+            d = defer.Deferred()
+            self.downloading[url].append(d)
+            d.addCallback(self.set_path, item)
+            return d
+
+        host = urlparse(url).netloc
+        if host not in self.semaphores:
+            self.semaphores[host] = defer.DeferredSemaphore(self.per_host)
+        self.downloading[url] = []
+        d = self.semaphores[host].run(self.download, url, spider)
+        d.addCallback(self.finish, url)
+        d.addCallback(self.set_path, item)
+        return d
+
+    def finish(self, path, url):
+        for waiting in self.downloading.pop(url):
+            waiting.callback(path)
+        return path
+
+    def download(self, url, spider):
+        partial_path = os.path.join(self.store, "partial", hashlib.sha1(url.encode()).hexdigest() + ".part")
+        offset = os.path.getsize(partial_path) if os.path.exists(partial_path) else 0
+
+        headers = {"Range": "bytes={}-".format(offset)} if offset else {}
+        # Keep whatever arrived if the connection drops, it is resumed next time.
+        meta = {"download_fail_on_dataloss": False, "download_maxsize": self.max_size}
+        request = scrapy.Request(url, headers=headers, meta=meta, dont_filter=True)
+
+        d = engine_download(self.crawler, request)
+        d.addCallback(self.downloaded, url, spider, partial_path, offset)
+        d.addErrback(lambda failure: spider.logger.warning("PDF download failed for %s: %s", url, failure.value))
+        return d
+
+    def downloaded(self, response, url, spider, partial_path, offset):
+        if response.status == 416 and offset:
+            # The partial file does not fit the PDF on the server any more: start over.
+            os.remove(partial_path)
+            return self.download(url, spider)
+        return threads.deferToThread(self.save, url, response, partial_path, offset)
+
+    def save(self, url, response, partial_path, offset):
+        # Runs in a thread: hashing and writing a PDF should not block the reactor.
+        if response.status == 206:
+            with open(partial_path, "ab") as f:
+                f.write(response.body)
+        elif response.status == 200:
+            with open(partial_path, "wb") as f:
+                f.write(response.body)
         else:
-            raise DropItem("Missing keyword in %s" % item)
+            return None
+
+        if "dataloss" in response.flags:
+            return None
+
+        sha256 = hashlib.sha256()
+        with open(partial_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                sha256.update(chunk)
+        sha256 = sha256.hexdigest()
+
+        path = self.path_for(sha256)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(partial_path)
+        else:
+            os.replace(partial_path, path)
+
+        with open(os.path.join(self.store, "index.jsonl"), "a", encoding="utf-8") as f:
+            f.write(json.dumps({"url": url, "sha256": sha256}) + "\n")
+        self.index[url] = sha256
+        return path
+
+    def set_path(self, path, item):
+        item["pdf_path"] = path or ""
+        return item
+
+    def path_for(self, sha256):
+        return os.path.join(self.store, sha256[:2], sha256 + ".pdf")
+
+
+class PdfMiningPipeline:
+    """Find code urls in the body of the downloaded PDFs, not only in the abstract.
+
+    The text of the first PDF_MINING_PAGES pages of each PDF is extracted in a process pool
+    (PDF_MINING_WORKERS processes, all cores by default), shared by all spiders. The reactor
+    only waits on a Deferred, and the repository urls found are appended to `code_url` as
+    each PDF finishes. Runs after PdfDownloadPipeline and needs pypdf.
+    """
+
+    executor = None
+    open_spiders = 0
+
+    def __init__(self, workers, pages):
+        self.workers = workers
+        self.pages = pages
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool("PDF_MINING_ENABLED"):
+            raise NotConfigured
+        return cls(settings.getint("PDF_MINING_WORKERS") or os.cpu_count(), settings.getint("PDF_MINING_PAGES", 3))
+
+    def open_spider(self, spider):
+        if PdfMiningPipeline.executor is None:
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+
+            # Not fork: the reactor thread pool is busy with lookups and downloads, and a forked
+            # child could inherit one of their locks held. Workers start from a clean process, which
+            # imports the main script again: it must start the crawl under `if __name__ == "__main__"`.
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            PdfMiningPipeline.executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                             mp_context=multiprocessing.get_context(method))
+        PdfMiningPipeline.open_spiders += 1
+
+    def close_spider(self, spider):
+        PdfMiningPipeline.open_spiders -= 1
+        if PdfMiningPipeline.open_spiders == 0:
+            PdfMiningPipeline.executor.shutdown()
+            PdfMiningPipeline.executor = None
+
+    def process_item(self, item, spider):
+        if not item.get("pdf_path"):
+            return item
+
+        future = self.executor.submit(extract_code_urls, item["pdf_path"], self.pages)
+        d = defer.Deferred()
+        # The future completes in an executor thread, hand the result back to the reactor thread.
+        future.add_done_callback(lambda f: reactor.callFromThread(self.fire, d, f))
+        d.addCallback(self.add_code_urls, item)
+        d.addErrback(self.mining_failed, item, spider)
+        return d
+
+    @staticmethod
+    def mining_failed(failure, item, spider):
+        # Keep the paper, just without the urls of its PDF.
+        spider.logger.warning("PDF mining failed for %s: %s", item["pdf_path"], failure.value)
+        return item
+
+    @staticmethod
+    def fire(d, future):
+        if future.exception() is not None:
+            d.errback(future.exception())
+        else:
+            d.callback(future.result())
+
+    @staticmethod
+    def add_code_urls(urls, item):
+        code_urls = list(item.get("code_url", []))
+        code_urls.extend(url for url in urls if url not in code_urls)
+        item["code_url"] = code_urls
+        return item
+
+
+class StreamingCsvPipeline:
+    """Write accepted papers straight to a CSV file instead of holding them until the end of the crawl.
+
+    Rows go to "<output>.part" through a bounded write buffer, which is flushed every
+    STREAM_FLUSH_ITEMS rows or STREAM_FLUSH_SECONDS seconds, so an interrupted crawl keeps
+    everything up to the last flush. When the last spider writing to a file closes, the
+    ".part" file is atomically renamed to its final name. With STREAM_SHARD_BY_CONF, every
+    conference-year (e.g. CVPR2023) gets its own "<output>_<conf>.csv".
+    """
+
+    # All spiders of one CrawlerProcess share the output files: path -> open file state.
+    _outputs = {}
+
+    def __init__(self, uri, fields, flush_items, flush_seconds, buffer_size, shard):
+        self.uri = uri
+        self.fields = fields
+        self.flush_items = flush_items
+        self.flush_seconds = flush_seconds
+        self.buffer_size = buffer_size
+        self.shard = shard
+        self.paths = set()
+        self.flush_loop = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        uri = settings.get("STREAM_EXPORT_URI")
+        if not uri:
+            raise NotConfigured
+        return cls(
+            uri=uri,
+            fields=settings.getlist("FEED_EXPORT_FIELDS"),
+            flush_items=settings.getint("STREAM_FLUSH_ITEMS", 100),
+            flush_seconds=settings.getfloat("STREAM_FLUSH_SECONDS", 10),
+            buffer_size=settings.getint("STREAM_BUFFER_SIZE", 64 * 1024),
+            shard=settings.getbool("STREAM_SHARD_BY_CONF"),
+        )
+
+    def open_spider(self, spider):
+        self.flush_loop = task.LoopingCall(self.flush)
+        self.flush_loop.start(self.flush_seconds, now=False)
+
+    def close_spider(self, spider):
+        if self.flush_loop is not None and self.flush_loop.running:
+            self.flush_loop.stop()
+
+        for path in self.paths:
+            output = self._outputs[path]
+            output["users"] -= 1
+            if output["users"] == 0:
+                output["file"].close()
+                os.replace(path + ".part", path)
+                del self._outputs[path]
+        self.paths = set()
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        output = self._output_for(adapter.get("conf"))
+
+        row = []
+        for field in self.fields:
+            value = adapter.get(field)
+            if value is None:
+                value = ""
+            elif isinstance(value, (list, tuple)):
+                # Same as Scrapy's CsvItemExporter: list fields are joined with commas.
+                value = ",".join(value)
+            row.append(value)
+        output["writer"].writerow(row)
+
+        output["pending"] += 1
+        if output["pending"] >= self.flush_items:
+            output["file"].flush()
+            output["pending"] = 0
+        return item
+
+    def flush(self):
+        for path in self.paths:
+            output = self._outputs[path]
+            if output["pending"]:
+                output["file"].flush()
+                output["pending"] = 0
+
+    def _output_for(self, conf):
+        path = self.uri
+        if self.shard:
+            stem, ext = os.path.splitext(self.uri)
+            path = "{}_{}{}".format(stem, conf, ext or ".csv")
+
+        if path not in self._outputs:
+            f = open(path + ".part", "w", newline="", encoding="utf-8", buffering=self.buffer_size)
+            writer = csv.writer(f)
+            writer.writerow(self.fields)
+            self._outputs[path] = {"file": f, "writer": writer, "pending": 0, "users": 0}
+
+        if path not in self.paths:
+            self.paths.add(path)
+            self._outputs[path]["users"] += 1
+        return self._outputs[path]
+
+
+class DistributedItemPipeline:
+    """In distributed mode, push every accepted paper to the shared store as one JSON object.
+
+    All the nodes push to the same "<DISTRIBUTED_JOB>:items" list, which `collect.py`
+    drains into a single CSV file. Papers not collected expire with the other keys of the job.
+    """
+
+    def __init__(self, store, job, ttl):
+        self.store = store
+        self.key = "{}:items".format(job)
+        self.ttl = ttl
+        self.refreshed = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.get("DISTRIBUTED_URL"):
+            raise NotConfigured
+        return cls(*store_from_settings(crawler.settings), crawler.settings.getint("DISTRIBUTED_TTL", 0))
+
+    def process_item(self, item, spider):
+        self.store.rpush(self.key, json.dumps(ItemAdapter(item).asdict()))
+        now = time.monotonic()
+        if self.ttl and (self.refreshed is None or now - self.refreshed >= 60):
+            self.refreshed = now
+            self.store.expire(self.key, self.ttl)
+        return item
+
+
+class JsonLinesStreamPipeline:
+    """Stream every accepted paper as one JSON Lines record while the crawl is running.
+
+    The target (JSONL_STREAM, `main.py -jsonl`) is "-" for stdout (Scrapy logs to stderr),
+    "unix:/path/to.sock" for a consumer listening on a Unix socket, or a file rotated every
+    JSONL_ROTATE_BYTES. Records are written and flushed one by one from a writer thread; at most
+    JSONL_BUFFER_ITEMS records wait for it, then the pipeline waits as well. List fields are
+    sent as arrays (see `streams.paper_record`). All the spiders of the process share the stream.
+    """
+
+    writer = None
+    users = 0
+
+    def __init__(self, target, max_bytes, buffer_items):
+        self.target = target
+        self.max_bytes = max_bytes
+        self.buffer_items = buffer_items
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        target = settings.get("JSONL_STREAM")
+        if not target:
+            raise NotConfigured
+        return cls(target, settings.getint("JSONL_ROTATE_BYTES", 0), settings.getint("JSONL_BUFFER_ITEMS", 1000))
+
+    def open_spider(self, spider):
+        if JsonLinesStreamPipeline.writer is None:
+            sink = open_sink(self.target, self.max_bytes)
+            JsonLinesStreamPipeline.writer = StreamWriter(sink, self.buffer_items)
+            JsonLinesStreamPipeline.writer.start()
+        JsonLinesStreamPipeline.users += 1
+
+    def close_spider(self, spider):
+        JsonLinesStreamPipeline.users -= 1
+        if JsonLinesStreamPipeline.users == 0:
+            JsonLinesStreamPipeline.writer.close()
+            JsonLinesStreamPipeline.writer = None
+
+    def process_item(self, item, spider):
+        line = paper_record(ItemAdapter(item).asdict())
+        if self.writer.full():
+            # Wait for room off the reactor thread, the other spiders keep crawling meanwhile.
+            return threads.deferToThread(self.writer.put, line).addCallback(lambda _: item)
+        self.writer.put(line)
+        return item
@@ -0,0 +1,120 @@
+import math
+import time
+from collections import Counter, defaultdict
+
+# Latency of a host when no page at all could be timed.
+DEFAULT_LATENCY = 1.0
+
+
+def _duration(seconds):
+    if seconds < 60:
+        return "{:.0f} s".format(seconds)
+    if seconds < 3600:
+        return "{:.0f} min".format(seconds / 60)
+    return "{:.1f} h".format(seconds / 3600)
+
+
+class CrawlPlan:
+    """What a crawl would fetch, gathered by a dry run (`main.py --plan`, see `PlanMiddleware`).
+
+    Per conference-year: the listing pages fetched, the paper pages that would be fetched, and
+    the papers that would reach the pipelines, with how many of them have a DOI already. The
+    papers with a DOI are looked up in batches, the others are searched by title one by one
+    (fewer once the queries filter them). Per host: the paper pages, and the latency measured on
+    the listing pages, from which the duration of the real crawl is estimated.
+    """
+
+    def __init__(self):
+        self.venues = defaultdict(Counter)  # conf -> Counter(index=, detail=, papers=, dois=)
+        self.detail_hosts = defaultdict(Counter)  # conf -> Counter(host -> paper pages)
+        self.latencies = defaultdict(list)  # host -> download latencies of the listing pages
+        self.started = time.monotonic()
+
+    def fetched(self, conf, host, latency):
+        if conf is not None:
+            self.venues[conf]["index"] += 1
+        if latency is not None:
+            self.latencies[host].append(latency)
+
+    def detail(self, conf, host, papers=1, dois=0):
+        # A paper page (or an export of `papers` papers), `dois` of them known before it is fetched.
+        self.venues[conf]["detail"] += 1
+        self.venues[conf]["papers"] += papers
+        self.venues[conf]["dois"] += dois
+        self.detail_hosts[conf][host] += 1
+
+    def listed(self, conf, doi=False):
+        # A paper taken from a listing page, no paper page to fetch for it.
+        self.venues[conf]["papers"] += 1
+        self.venues[conf]["dois"] += bool(doi)
+
+    def latency(self, host):
+        latencies = self.latencies.get(host) or [l for ls in self.latencies.values() for l in ls]
+        return sum(latencies) / len(latencies) if latencies else DEFAULT_LATENCY
+
+    def latency_source(self, host):
+        if host in self.latencies:
+            return "measured"
+        if self.latencies:
+            return "mean of the other hosts"
+        return "assumed, nothing was timed"
+
+    @staticmethod
+    def enrichment(settings):
+        # Batch size and top rate of the first enrichment provider, the one every lookup goes to.
+        from .providers import PROVIDERS
+        names = [name.strip().lower() for name in settings.getlist("ENRICH_PROVIDERS", ["openalex"]) if name.strip()]
+        provider = PROVIDERS.get(names[0] if names else "openalex", PROVIDERS["openalex"])
+        return provider.batch_size, settings.getfloat((provider.prefix or "OPENALEX") + "_MAX_RATE", provider.default_max_rate)
+
+    @staticmethod
+    def lookups(counts, batch_size):
+        # Requests to the provider: the DOIs in batches, a title search for every other paper.
+        return math.ceil(counts["dois"] / batch_size) + counts["papers"] - counts["dois"]
+
+    def estimate(self, hosts, lookups, rate, settings):
+        # Seconds to fetch `hosts` (host -> requests) and make `lookups` provider requests. Hosts
+        # are fetched in parallel, each at most `concurrency` requests at a time and `delay`
+        # seconds apart, and the lookups run alongside at `rate` (the limiter ramps up fast).
+        concurrency = min(n for n in (
+            settings.getint("CONCURRENT_REQUESTS"),
+            settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+            settings.getint("GLOBAL_CONCURRENT_REQUESTS_PER_HOST") if settings.getbool("COALESCE_ENABLED") else 0,
+        ) if n > 0)
+        delay = max(settings.getfloat("DOWNLOAD_DELAY"), settings.getfloat("GLOBAL_DOWNLOAD_DELAY"))
+        seconds = [count * max(self.latency(host) / concurrency, delay) for host, count in hosts.items()]
+        seconds.append(lookups / rate)
+        return max(seconds)
+
+    def report(self, settings, crossref=True):
+        batch_size, rate = self.enrichment(settings)
+        lines = ["{:<16} {:>8} {:>8} {:>8} {:>9} {:>10}".format(
+            "venue", "listing", "papers", "paper", "lookup", "estimated")]
+        lines.append("{:<16} {:>8} {:>8} {:>8} {:>9} {:>10}".format("", "pages", "", "pages", "requests", "alone"))
+        total = Counter()
+        hosts = Counter()
+        for conf in sorted(self.venues):
+            counts = self.venues[conf]
+            lookups = self.lookups(counts, batch_size) if crossref else 0
+            lines.append("{:<16} {:>8} {:>8} {:>8} {:>9} {:>10}".format(
+                conf, counts["index"], counts["papers"], counts["detail"], lookups,
+                _duration(self.estimate(self.detail_hosts[conf], lookups, rate, settings))))
+            total.update(counts)
+            hosts.update(self.detail_hosts[conf])
+
+        lookups = self.lookups(total, batch_size) if crossref else 0
+        discovery = time.monotonic() - self.started
+        lines.append("{:<16} {:>8} {:>8} {:>8} {:>9} {:>10}".format(
+            "total", total["index"], total["papers"], total["detail"], lookups,
+            _duration(discovery + self.estimate(hosts, lookups, rate, settings))))
+        lines.append("")
+        lines.append("Listing pages took {} in this run. Paper pages per host, at the latency of the listing pages:".format(
+            _duration(discovery)))
+        for host, count in hosts.most_common():
+            lines.append("  {:<40} {:>8} pages, {:.2f} s each ({})".format(
+                host, count, self.latency(host), self.latency_source(host)))
+        if crossref:
+            lines.append("Lookup requests: the {} papers with a known DOI in batches of {}, one title search for each "
+                         "of the others. An upper bound: only the papers matching the queries are looked up, and paper "
+                         "pages may give more DOIs.".format(total["dois"], batch_size))
+        return "\n".join(lines)
@@ -0,0 +1,160 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+import scrapy
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+# Only the frames of this package count as "our code": the spiders, the query parser, the pipelines.
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return "{} ({}:{})".format(code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+def _owner(frame):
+    # The spider a project frame works for: `self` in the spider callbacks, `spider` in the
+    # pipelines and middlewares.
+    try:
+        local_vars = frame.f_locals
+    except Exception:
+        return None
+    for name in ("spider", "self"):
+        value = local_vars.get(name)
+        if isinstance(value, scrapy.Spider):
+            return value.name
+    return None
+
+
+class Sampler(threading.Thread):
+    """Background thread taking a snapshot of every thread's stack every `interval` seconds.
+
+    A stack is kept only if it goes through the project's code. Twisted and Scrapy internals
+    around and between the project frames are left out, while the library calls made by the
+    innermost project frame (fuzzywuzzy, pyparsing, ...) are kept. Every sample is
+    attributed to the spider found in the locals of its project frames.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name="crawl-conf-profiler", daemon=True)
+        self.interval = interval
+        self.stacks = defaultdict(Counter)  # spider name -> Counter of stacks (tuples, root first)
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self.sample(frame)
+
+    def sample(self, frame):
+        # Walk from the leaf up: library frames are kept until the first project frame,
+        # above it only the project frames are.
+        stack = []
+        owner = None
+        in_project = False
+        while frame is not None:
+            if frame.f_code.co_filename.startswith(PROJECT_DIR):
+                in_project = True
+                stack.append(frame)
+                if owner is None:
+                    owner = _owner(frame)
+            elif not in_project:
+                stack.append(frame)
+            frame = frame.f_back
+        if not in_project or owner is None:
+            return
+        while not stack[-1].f_code.co_filename.startswith(PROJECT_DIR):
+            stack.pop()
+        names = tuple(_frame_name(f) for f in reversed(stack))
+        with self.lock:
+            self.stacks[owner][names] += 1
+
+    def take(self, spider_name):
+        with self.lock:
+            return self.stacks.pop(spider_name, Counter())
+
+
+class ProfilerExtension:
+    """Sampling profiler of the project's own code, enabled by PROFILE_DIR (`main.py --profile`).
+
+    All the spiders of the process share one sampling thread. When a spider closes, two files
+    are written to PROFILE_DIR:
+
+    - "<spider>.txt": the functions sorted by own time, with their cumulative time.
+    - "<spider>.folded": one "frame;frame;frame count" line per stack, the input of
+      flamegraph.pl, speedscope or inferno.
+    """
+
+    sampler = None
+    open_spiders = 0
+
+    def __init__(self, directory, interval):
+        self.directory = directory
+        self.interval = interval
+        self.started = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("PROFILE_DIR")
+        if not directory:
+            raise NotConfigured
+        extension = cls(directory, crawler.settings.getfloat("PROFILE_INTERVAL", 0.005))
+        crawler.signals.connect(extension.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(extension.spider_closed, signal=signals.spider_closed)
+        return extension
+
+    def spider_opened(self, spider):
+        if ProfilerExtension.sampler is None:
+            ProfilerExtension.sampler = Sampler(self.interval)
+            ProfilerExtension.sampler.start()
+        ProfilerExtension.open_spiders += 1
+        self.started = time.monotonic()
+
+    def spider_closed(self, spider):
+        sampler = ProfilerExtension.sampler
+        stacks = sampler.take(spider.name)
+        ProfilerExtension.open_spiders -= 1
+        if ProfilerExtension.open_spiders == 0:
+            sampler.stopped.set()
+            ProfilerExtension.sampler = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        folded_path = os.path.join(self.directory, spider.name + ".folded")
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write("{} {}\n".format(";".join(stack), count))
+
+        report_path = os.path.join(self.directory, spider.name + ".txt")
+        with open(report_path, "w", encoding="utf-8") as f:
+            f.write(self.report(spider.name, stacks, time.monotonic() - self.started))
+        spider.logger.info("Profile written to %s and %s", report_path, folded_path)
+
+    def report(self, name, stacks, elapsed):
+        own = Counter()
+        cumulative = Counter()
+        for stack, count in stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                cumulative[frame] += count
+        total = max(sum(stacks.values()), 1)
+
+        lines = [
+            "Spider {}: {} samples every {:g} ms over {:.1f} s of crawl".format(
+                name, sum(stacks.values()), self.interval * 1000, elapsed),
+            "Times are estimated from the samples; a sample counts once for every thread running project code.",
+            "",
+            "{:>10} {:>7} {:>10} {:>7}  function".format("own (s)", "own %", "cum (s)", "cum %"),
+        ]
+        for frame in sorted(cumulative, key=lambda f: (own[f], cumulative[f]), reverse=True):
+            lines.append("{:>10.3f} {:>6.1f}% {:>10.3f} {:>6.1f}%  {}".format(
+                own[frame] * self.interval, 100 * own[frame] / total,
+                cumulative[frame] * self.interval, 100 * cumulative[frame] / total, frame))
+        return "\n".join(lines) + "\n"
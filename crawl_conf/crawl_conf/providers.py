@@ -0,0 +1,340 @@
+"""Enrichment providers: the services a paper's citation count, topics and DOI are looked up in.
+
+Every provider answers two questions, each through the cheapest path its API offers:
+
+- `lookup_dois(dois)`: the works of up to `batch_size` DOIs in one request (OpenAlex OR-filter,
+  Crossref multi-DOI filter, Semantic Scholar POST /paper/batch).
+- `search_title(title)`: the candidate works for a title, fuzzy-matched by the pipeline.
+
+`ProviderChain` tries them in the ENRICH_PROVIDERS order. A provider that fails
+ENRICH_FAILURE_THRESHOLD times in a row is skipped for ENRICH_COOLDOWN seconds, so a slow or
+down service does not hold the crawl. Every base url is a setting, to point a provider at a
+local stand-in (see `mocksite.py`).
+"""
+import logging
+import threading
+import time
+
+from twisted.internet import defer, reactor, threads
+
+from .openalex import MAX_DOIS_PER_REQUEST, SEARCH_PER_PAGE, WORK_FIELDS, OpenAlexClient, Work, loads, normalize_doi, parse_works
+from .ratelimit import AdaptiveRateLimiter, request_with_retry
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    # The service did not answer (connection error, timeout, 5xx after the retries...).
+    pass
+
+
+def _doi_url(doi):
+    # Works carry their DOI as OpenAlex does, as a doi.org url.
+    return "https://doi.org/" + normalize_doi(doi) if doi else None
+
+
+class HttpProvider:
+    """Base of the providers: a requests.Session and an adaptive rate limiter of their own."""
+
+    name = None
+    batch_size = 1
+    # Settings prefix: <PREFIX>_URL, <PREFIX>_RATE, <PREFIX>_MAX_RATE.
+    prefix = None
+    default_url = None
+    default_rate = 5.0
+    default_max_rate = 10.0
+
+    def __init__(self, url, rate, max_rate, max_retries=2, backoff=1.0, timeout=15, mailto=None):
+        self.url = url.rstrip("/")
+        self.limiter = AdaptiveRateLimiter(rate=rate, max_rate=max_rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.mailto = mailto
+        self._session = None
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            url=settings.get(cls.prefix + "_URL") or cls.default_url,
+            rate=settings.getfloat(cls.prefix + "_RATE", cls.default_rate),
+            max_rate=settings.getfloat(cls.prefix + "_MAX_RATE", cls.default_max_rate),
+            max_retries=settings.getint("ENRICH_MAX_RETRIES", 2),
+            backoff=settings.getfloat("OPENALEX_BACKOFF", 1.0),
+            timeout=settings.getfloat("ENRICH_TIMEOUT", 15),
+            mailto=settings.get("OPENALEX_MAILTO"),
+        )
+
+    @property
+    def session(self):
+        if self._session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=10)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            self._session = session
+        return self._session
+
+    def request(self, method, path, **kwargs):
+        # The parsed JSON body, None for a 404, ProviderError when the service did not answer.
+        response = request_with_retry(self.limiter, method, self.url + path, max_retries=self.max_retries,
+                                      backoff=self.backoff, session=self.session, timeout=self.timeout, **kwargs)
+        if response is None:
+            raise ProviderError("{}: no response".format(self.name))
+        if response.status_code == 404:
+            return None
+        if response.status_code != 200:
+            raise ProviderError("{}: HTTP {}".format(self.name, response.status_code))
+        return loads(response.content)
+
+    def lookup_dois(self, dois):
+        raise NotImplementedError
+
+    def search_title(self, title):
+        raise NotImplementedError
+
+
+class OpenAlexProvider(HttpProvider):
+    # OpenAlex, through the shared OpenAlexClient (polite pool, coalescing, cache).
+
+    name = "openalex"
+    batch_size = MAX_DOIS_PER_REQUEST
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(OpenAlexClient.from_settings(settings))
+
+    def check(self, response):
+        if response is None or response.status_code not in (200, 404):
+            raise ProviderError("openalex: {}".format("no response" if response is None else
+                                                      "HTTP {}".format(response.status_code)))
+        return response.status_code == 200
+
+    def lookup_dois(self, dois):
+        params = {"filter": "doi:" + "|".join(dois), "per-page": MAX_DOIS_PER_REQUEST, "select": WORK_FIELDS}
+        response = self.client.get(self.client.url, params=params)
+        if not self.check(response):
+            return {}
+        return {normalize_doi(work.doi): work for work in parse_works(response.content) if work.doi}
+
+    def search_title(self, title):
+        response = self.client.search_works(title, select=WORK_FIELDS, per_page=SEARCH_PER_PAGE)
+        if not self.check(response):
+            return []
+        return parse_works(response.content)
+
+
+class CrossrefProvider(HttpProvider):
+    # Crossref REST API. No topics: its "subject" field is empty for most recent works.
+
+    name = "crossref"
+    batch_size = 50
+    prefix = "CROSSREF"
+    default_url = "https://api.crossref.org/works"
+    fields = "DOI,title,is-referenced-by-count"
+
+    def params(self, **params):
+        params["select"] = self.fields
+        if self.mailto:
+            params["mailto"] = self.mailto
+        return params
+
+    @staticmethod
+    def work(data):
+        titles = data.get("title") or [None]
+        return Work(title=titles[0], doi=_doi_url(data.get("DOI")),
+                    cited_by_count=data.get("is-referenced-by-count", -1))
+
+    def lookup_dois(self, dois):
+        # Several doi filters are OR-ed: filter=doi:a,doi:b
+        data = self.request("GET", "", params=self.params(
+            filter=",".join("doi:" + doi for doi in dois), rows=len(dois)))
+        if data is None:
+            return {}
+        return {normalize_doi(item["DOI"]): self.work(item) for item in data["message"]["items"]}
+
+    def search_title(self, title):
+        data = self.request("GET", "", params=self.params(**{"query.bibliographic": title, "rows": SEARCH_PER_PAGE}))
+        if data is None:
+            return []
+        return [self.work(item) for item in data["message"]["items"]]
+
+
+class SemanticScholarProvider(HttpProvider):
+    # Semantic Scholar Academic Graph API. Without an API key (S2_API_KEY) the rate is low.
+
+    name = "semanticscholar"
+    batch_size = 500
+    prefix = "S2"
+    default_url = "https://api.semanticscholar.org/graph/v1"
+    default_rate = 1.0
+    default_max_rate = 1.0
+    fields = "title,externalIds,citationCount,fieldsOfStudy"
+    headers = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        provider = super().from_settings(settings)
+        if settings.get("S2_API_KEY"):
+            provider.headers = {"x-api-key": settings.get("S2_API_KEY")}
+        return provider
+
+    @staticmethod
+    def work(data):
+        return Work(title=data.get("title"), doi=_doi_url((data.get("externalIds") or {}).get("DOI")),
+                    cited_by_count=data.get("citationCount", -1), topics=tuple(data.get("fieldsOfStudy") or ()))
+
+    def lookup_dois(self, dois):
+        # The answer has one entry per id, in order, null for the unknown ones.
+        data = self.request("POST", "/paper/batch", params={"fields": self.fields},
+                            json={"ids": ["DOI:" + doi for doi in dois]}, headers=self.headers)
+        if data is None:
+            return {}
+        return {doi: self.work(entry) for doi, entry in zip(dois, data) if entry}
+
+    def search_title(self, title):
+        data = self.request("GET", "/paper/search", params={"query": title, "limit": SEARCH_PER_PAGE,
+                                                            "fields": self.fields}, headers=self.headers)
+        if data is None:
+            return []
+        return [self.work(entry) for entry in data.get("data") or ()]
+
+
+PROVIDERS = {
+    "openalex": OpenAlexProvider,
+    "crossref": CrossrefProvider,
+    "semanticscholar": SemanticScholarProvider,
+}
+
+
+class ProviderChain:
+    """The providers in fallback order, each behind a circuit breaker.
+
+    DOIs a provider does not know, and titles it finds no candidate for, are tried on the next one.
+    Thread-safe: the lookups run in the reactor thread pool.
+    """
+
+    def __init__(self, providers, failure_threshold=3, cooldown=60.0):
+        self.providers = providers
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.lock = threading.Lock()
+        self.failures = {provider.name: 0 for provider in providers}
+        self.open_until = {provider.name: 0.0 for provider in providers}
+
+    @classmethod
+    def from_settings(cls, settings):
+        names = [name.strip().lower() for name in settings.getlist("ENRICH_PROVIDERS", ["openalex"]) if name.strip()]
+        for name in names:
+            if name not in PROVIDERS:
+                raise ValueError("Unknown enrichment provider {!r}, expected one of {}".format(name, ", ".join(PROVIDERS)))
+        return cls([PROVIDERS[name].from_settings(settings) for name in names],
+                   failure_threshold=settings.getint("ENRICH_FAILURE_THRESHOLD", 3),
+                   cooldown=settings.getfloat("ENRICH_COOLDOWN", 60))
+
+    @property
+    def batch_size(self):
+        # DOIs are gathered in batches the first provider takes in one request.
+        return self.providers[0].batch_size if self.providers else 1
+
+    def available(self, provider):
+        with self.lock:
+            return time.monotonic() >= self.open_until[provider.name]
+
+    def succeeded(self, provider):
+        with self.lock:
+            self.failures[provider.name] = 0
+
+    def failed(self, provider, error):
+        with self.lock:
+            self.failures[provider.name] += 1
+            if self.failures[provider.name] < self.failure_threshold:
+                opened = False
+            else:
+                self.failures[provider.name] = 0
+                self.open_until[provider.name] = time.monotonic() + self.cooldown
+                opened = True
+        if opened:
+            logger.warning("%s, skipped for %.0f s", error, self.cooldown)
+        else:
+            logger.warning("%s", error)
+
+    def lookup_dois(self, dois):
+        # Normalized DOI -> Work, for the DOIs one of the providers knows.
+        works = {}
+        missing = list(dict.fromkeys(normalize_doi(doi) for doi in dois if doi))
+        for provider in self.providers:
+            if not missing:
+                break
+            if not self.available(provider):
+                continue
+            for i in range(0, len(missing), provider.batch_size):
+                try:
+                    works.update(provider.lookup_dois(missing[i:i + provider.batch_size]))
+                except ProviderError as e:
+                    self.failed(provider, e)
+                    break
+                self.succeeded(provider)
+            missing = [doi for doi in missing if doi not in works]
+        return works
+
+    def search_title(self, title):
+        # The candidates of the first provider that has any.
+        for provider in self.providers:
+            if not self.available(provider):
+                continue
+            try:
+                candidates = [work for work in provider.search_title(title) if work.title]
+            except ProviderError as e:
+                self.failed(provider, e)
+                continue
+            self.succeeded(provider)
+            if candidates:
+                return candidates
+        return []
+
+
+class DoiBatcher:
+    """Gathers the DOI lookups of the items in the pipeline into bulk lookups.
+
+    Lookups wait at most `delay` seconds, or until `chain.batch_size` DOIs are waiting, then go
+    out together in the reactor thread pool. Used from the reactor thread only.
+    """
+
+    def __init__(self, chain, delay):
+        self.chain = chain
+        self.delay = delay
+        self.pending = {}  # normalized DOI -> Deferreds of the items waiting for it
+        self.call = None
+
+    def lookup(self, doi):
+        # A Deferred firing with the Work of this DOI, or None.
+        d = defer.Deferred()
+        self.pending.setdefault(normalize_doi(doi), []).append(d)
+        if len(self.pending) >= self.chain.batch_size:
+            self.flush()
+        elif self.call is None:
+            self.call = reactor.callLater(self.delay, self.flush)
+        return d
+
+    def flush(self):
+        if self.call is not None and self.call.active():
+            self.call.cancel()
+        self.call = None
+        batch, self.pending = self.pending, {}
+        if batch:
+            threads.deferToThread(self.chain.lookup_dois, list(batch)).addBoth(self.resolve, batch)
+
+    def resolve(self, works, batch):
+        if not isinstance(works, dict):
+            logger.error("DOI lookup failed: %s", works.getErrorMessage())
+            works = {}
+        for doi, waiting in batch.items():
+            for d in waiting:
+                d.callback(works.get(doi))
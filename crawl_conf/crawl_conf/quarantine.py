@@ -0,0 +1,74 @@
+import base64
+import gzip
+import hashlib
+import json
+import os
+import time
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+
+
+def _json_safe(meta):
+    # Keep the meta entries a callback may read (conf, doi...), drop what cannot be stored.
+    safe = {}
+    for key, value in meta.items():
+        try:
+            json.dumps(value)
+        except (TypeError, ValueError):
+            continue
+        safe[key] = value
+    return safe
+
+
+def record_path(directory, spider_name, url, callback):
+    key = hashlib.sha1("{} {}".format(callback, url).encode()).hexdigest()
+    return os.path.join(directory, spider_name, key + ".json.gz")
+
+
+def save_response(directory, response, spider, exception):
+    """Store a response whose callback raised, with what is needed to run the callback again.
+
+    One gzipped JSON file per (callback, url) in DIRECTORY/<spider>/: a page failing again
+    overwrites its previous record.
+    """
+    callback = getattr(response.request.callback, "__name__", None) or "parse"
+    path = record_path(directory, spider.name, response.url, callback)
+    record = {
+        "url": response.url,
+        "status": response.status,
+        "headers": {k.decode("latin-1"): [v.decode("latin-1") for v in vs] for k, vs in response.headers.items()},
+        "body": base64.b64encode(response.body).decode("ascii"),
+        "callback": callback,
+        "meta": _json_safe(response.meta),
+        "error": "{}: {}".format(type(exception).__name__, exception),
+        "time": time.time(),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        json.dump(record, f)
+    return path
+
+
+def load_record(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def load_records(directory, spider_name):
+    # Yields (path, record) for every response quarantined for this spider.
+    spider_dir = os.path.join(directory, spider_name)
+    if not os.path.isdir(spider_dir):
+        return
+    for name in sorted(os.listdir(spider_dir)):
+        if name.endswith(".json.gz"):
+            path = os.path.join(spider_dir, name)
+            yield path, load_record(path)
+
+
+def record_to_response(record, request):
+    # Rebuild the response as Scrapy would have built it (HtmlResponse, TextResponse...).
+    headers = Headers(record["headers"])
+    body = base64.b64decode(record["body"])
+    cls = responsetypes.from_args(headers=headers, url=record["url"], body=body)
+    return cls(url=record["url"], status=record["status"], headers=headers, body=body, request=request)
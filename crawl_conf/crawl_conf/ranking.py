@@ -0,0 +1,174 @@
+import re
+from array import array
+from collections import Counter
+
+TOKEN_RE = re.compile(r"\w+")
+QUERY_TOKEN_RE = re.compile(r'[\w*]+|[()"]')
+OPERATORS = {"and", "or", "not"}
+
+
+def query_words(expr):
+    # The words of a boolean query, split into (wanted, negated). As in BooleanSearchParser,
+    # "not" applies to the next word, quoted phrase or parenthesized group, and "not not"
+    # cancels out.
+    tokens = QUERY_TOKEN_RE.findall(expr.lower())
+    words = []
+    negated_words = []
+
+    def operand(i, negated):
+        # Reads one operand from tokens[i], returns the index after it.
+        while i < len(tokens) and tokens[i] == "not":
+            negated = not negated
+            i += 1
+        if i == len(tokens):
+            return i
+        token = tokens[i]
+        if token == "(":
+            i += 1
+            while i < len(tokens) and tokens[i] != ")":
+                i = operand(i, negated)
+        elif token == '"':
+            i += 1
+            while i < len(tokens) and tokens[i] != '"':
+                if tokens[i] not in "()":
+                    (negated_words if negated else words).append(tokens[i])
+                i += 1
+        elif token not in OPERATORS and token != ")":
+            (negated_words if negated else words).append(token)
+        return i + 1
+
+    i = 0
+    while i < len(tokens):
+        i = operand(i, False)
+    return words, negated_words
+
+
+class RankedIndex:
+    """BM25 index over the titles and abstracts of every crawled paper.
+
+    Papers are tokenized as they are added and only their term counts are kept, as
+    flat (doc, term, count) arrays. At ranking time a sparse BM25 matrix restricted to
+    the query words is built, and all the queries are scored with a single sparse
+    matrix product. NumPy and SciPy are only needed when ranking.
+    """
+
+    def __init__(self, k1=1.2, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.vocab = {}
+        self.rows = array("I")
+        self.cols = array("I")
+        self.counts = array("I")
+        self.lengths = array("I")
+        self.records = []
+
+    def __len__(self):
+        return len(self.records)
+
+    def add(self, text, record):
+        doc = len(self.records)
+        counts = Counter(TOKEN_RE.findall(text.lower()))
+        for term, count in counts.items():
+            self.rows.append(doc)
+            self.cols.append(self.vocab.setdefault(term, len(self.vocab)))
+            self.counts.append(count)
+        self.lengths.append(sum(counts.values()))
+        self.records.append(record)
+
+    def query_terms(self, expr, negated=False):
+        # The indexed words of a boolean query, operators left out: the wanted ones, or with
+        # `negated` the ones it excludes. "diffus*" expands to every indexed word starting
+        # with "diffus".
+        terms = []
+        for token in query_words(expr)[negated]:
+            if token.endswith("*"):
+                prefix = token.rstrip("*")
+                terms.extend(term for term in self.vocab if term.startswith(prefix))
+            elif token in self.vocab:
+                terms.append(token)
+        return set(terms)
+
+    @staticmethod
+    def term_matrix(vocab, query_terms):
+        # Terms x queries indicator matrix.
+        import numpy as np
+        from scipy import sparse
+
+        rows, cols = [], []
+        for j, terms in enumerate(query_terms):
+            for term in terms:
+                rows.append(vocab[term])
+                cols.append(j)
+        matrix = sparse.csc_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)),
+                                   shape=(len(vocab), len(query_terms)))
+        return matrix, rows
+
+    def bm25_matrix(self, columns=None):
+        # Documents x terms BM25 weights. With `columns` (a boolean mask over the vocabulary),
+        # only those terms are materialized, which is all the scoring of a few queries needs.
+        import numpy as np
+        from scipy import sparse
+
+        n_docs = len(self.records)
+        rows = np.frombuffer(self.rows, dtype=np.uint32)
+        cols = np.frombuffer(self.cols, dtype=np.uint32)
+        tf = np.frombuffer(self.counts, dtype=np.uint32).astype(np.float32)
+        lengths = np.frombuffer(self.lengths, dtype=np.uint32).astype(np.float32)
+
+        df = np.bincount(cols, minlength=len(self.vocab))
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+
+        if columns is not None:
+            keep = columns[cols]
+            rows, cols, tf = rows[keep], cols[keep], tf[keep]
+
+        norm = self.k1 * (1 - self.b + self.b * lengths / max(lengths.mean(), 1))
+        weights = tf * (self.k1 + 1) / (tf + norm[rows]) * idf[cols]
+
+        # The entries were appended document by document, so they are already in CSR order.
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_docs), out=indptr[1:])
+        return sparse.csr_matrix((weights, cols, indptr), shape=(n_docs, len(self.vocab)))
+
+    def top_k(self, queries, k):
+        """Score every (label, expression) query at once.
+
+        Returns {label: [(record, score, matched_terms), ...]} with at most k papers per
+        query, best first. Papers sharing no word with the query are left out, and so are the
+        papers containing a word the query negates (for "not (a and b)", either word).
+        """
+        import numpy as np
+
+        if not self.records:
+            return {label: [] for label, _ in queries}
+
+        query_terms = [self.query_terms(expr) for _, expr in queries]
+        negated_terms = [self.query_terms(expr, negated=True) for _, expr in queries]
+        query_matrix, rows = self.term_matrix(self.vocab, query_terms)
+        negated_matrix, negated_rows = self.term_matrix(self.vocab, negated_terms)
+
+        columns = np.zeros(len(self.vocab), dtype=bool)
+        columns[rows] = True
+        columns[negated_rows] = True
+        matrix = self.bm25_matrix(columns)
+        scores = (matrix @ query_matrix).toarray()
+        # BM25 weights are positive wherever a word occurs, so this is > 0 for the excluded papers.
+        scores[(matrix @ negated_matrix).toarray() > 0] = 0
+
+        inverse_vocab = {self.vocab[term]: term for terms in query_terms + negated_terms for term in terms}
+        results = {}
+        for j, (label, _) in enumerate(queries):
+            column = scores[:, j]
+            n = min(k, len(column))
+            best = np.argpartition(-column, n - 1)[:n]
+            best = best[np.argsort(-column[best])]
+
+            hits = []
+            for doc in best:
+                if column[doc] <= 0:
+                    break
+                row_terms = matrix.indices[matrix.indptr[doc]:matrix.indptr[doc + 1]]
+                matched = sorted(inverse_vocab[c] for c in row_terms if inverse_vocab[c] in query_terms[j])
+                hits.append((self.records[doc], float(column[doc]), matched))
+            results[label] = hits
+        return results
@@ -0,0 +1,101 @@
+import email.utils
+import random
+import threading
+import time
+
+# Status codes that mean "try again later" rather than "this request is wrong".
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class AdaptiveRateLimiter:
+    """Token bucket whose rate adapts to the server (AIMD).
+
+    Every successful response adds `increase` req/s to the rate, up to `max_rate`.
+    Every 429/5xx multiplies the rate by `decrease`, down to `min_rate`, and a
+    Retry-After header blocks all callers until the given time has passed.
+    Thread-safe, so one limiter can be shared by all enrichment threads.
+    """
+
+    def __init__(self, rate=5.0, max_rate=10.0, min_rate=0.2, increase=0.5, decrease=0.5, burst=1):
+        self.rate = min(rate, max_rate)
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.burst = burst
+
+        self.lock = threading.Lock()
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0
+
+    def acquire(self):
+        # Block until a token is available.
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                else:
+                    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_throttle(self, retry_after=None):
+        with self.lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+
+def parse_retry_after(value):
+    # Retry-After is either a number of seconds or an HTTP date.
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def request_with_retry(limiter, method, url, max_retries=5, backoff=1.0, session=None, **kwargs):
+    """Send a rate-limited request, retrying 429/5xx and connection errors.
+
+    Waits between attempts follow exponential backoff with full jitter, or the
+    server's Retry-After when it sends one. Returns the last response, or None
+    if every attempt failed with a connection error. Pass a requests.Session to
+    reuse its pooled keep-alive connections.
+    """
+    import requests
+
+    send = session.request if session is not None else requests.request
+    response = None
+    for attempt in range(max_retries + 1):
+        limiter.acquire()
+        try:
+            response = send(method, url, **kwargs)
+        except requests.RequestException:
+            response = None
+            retry_after = None
+        else:
+            if response.status_code not in RETRY_STATUS:
+                limiter.on_success()
+                return response
+            retry_after = parse_retry_after(response.headers.get("Retry-After"))
+
+        limiter.on_throttle(retry_after)
+        if attempt < max_retries and retry_after is None:
+            time.sleep(random.uniform(0, backoff * 2 ** attempt))
+    return response
@@ -11,8 +11,18 @@ BOT_NAME = 'crawl_conf'
 
 SPIDER_MODULES = ['crawl_conf.spiders']
 NEWSPIDER_MODULE = 'crawl_conf.spiders'
+# Spiders are looked up in the registry of crawl_conf/spiders/__init__.py and imported on demand.
+SPIDER_LOADER_CLASS = 'crawl_conf.spiders.LazySpiderLoader'
 
-LOG_LEVEL = "DEBUG"
+# At DEBUG, Scrapy logs every request and, with its default formatter, every item in full.
+# CompactLogFormatter logs one scraped paper in LOG_ITEM_SAMPLE (0 for none) by venue and title,
+# and dropped papers at DEBUG without rendering them; VenueStatsExtension counts both per venue.
+LOG_LEVEL = "INFO"
+LOG_FORMATTER = 'crawl_conf.logs.CompactLogFormatter'
+LOG_ITEM_SAMPLE = 1000
+# Also write the log records of level LOG_JSON_LEVEL and above as JSON Lines to this file.
+LOG_JSON_FILE = None
+LOG_JSON_LEVEL = "INFO"
 
 FEED_EXPORT_FIELDS = ['conf', 'matched_queries', 'title', 'citation_count', 'abstract', 'categories', 'concepts', 'code_url', 'pdf_url', 'authors', 'doi']
 
@@ -52,28 +62,181 @@ ROBOTSTXT_OBEY = False
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    'crawl_conf.middlewares.CrawlConfSpiderMiddleware': 543,
-#}
+SPIDER_MIDDLEWARES = {
+   'crawl_conf.middlewares.FrontierMiddleware': 543,
+   'crawl_conf.middlewares.DistributedSeedMiddleware': 544,
+   'crawl_conf.middlewares.QuarantineMiddleware': 545,
+   'crawl_conf.middlewares.QuarantineReplayMiddleware': 546,
+   'crawl_conf.middlewares.PlanMiddleware': 547,
+}
+
+# Listing pages are crawled before paper pages (see `callback_priorities` in spiders.py),
+# until this many requests are waiting in the scheduler. Then paper pages are drained first.
+FRONTIER_MAX_PENDING = 2000
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
+DOWNLOADER_MIDDLEWARES = {
 #    'crawl_conf.middlewares.CrawlConfDownloaderMiddleware': 543,
-#}
+   'crawl_conf.middlewares.QuarantineResponseMiddleware': 50,
+   'crawl_conf.middlewares.CoalescingMiddleware': 950,
+}
+
+# The spiders of one process share their downloads: a GET already in flight for another spider
+# is not sent twice, and the last COALESCE_CACHE_SIZE responses (up to COALESCE_MAX_BYTES each)
+# are reused. Per host, at most GLOBAL_CONCURRENT_REQUESTS_PER_HOST requests are sent at once,
+# GLOBAL_DOWNLOAD_DELAY seconds apart, counting the requests of all spiders.
+COALESCE_ENABLED = True
+COALESCE_CACHE_SIZE = 64
+COALESCE_MAX_BYTES = 1024 * 1024
+GLOBAL_CONCURRENT_REQUESTS_PER_HOST = 8
+GLOBAL_DOWNLOAD_DELAY = 0
+
+# Responses whose callback raised (e.g. a site changed its markup) are stored in QUARANTINE_DIR,
+# and `replay.py` runs the fixed callbacks on them. Set to None to disable.
+QUARANTINE_DIR = "quarantine"
+# Set by replay.py only: the spiders start from the responses quarantined in this directory.
+QUARANTINE_REPLAY_DIR = None
+
+# Dry run (`main.py --plan`): only the listing pages are crawled, the paper pages and OpenAlex
+# lookups are counted, and the duration of the real crawl is estimated.
+CRAWL_PLAN = False
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
-#EXTENSIONS = {
+EXTENSIONS = {
 #    'scrapy.extensions.telnet.TelnetConsole': None,
-#}
+   'crawl_conf.profiling.ProfilerExtension': 500,
+   'crawl_conf.logs.VenueStatsExtension': 510,
+}
+
+# Profiling (`main.py --profile`): the stacks going through the project's code (spider
+# callbacks, query parsing, pipelines, fuzzy matching) are sampled every PROFILE_INTERVAL
+# seconds, and a hot-spot report plus a flamegraph file are written per spider to PROFILE_DIR.
+PROFILE_DIR = None
+PROFILE_INTERVAL = 0.005
 
 # Configure item pipelines
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
+   'crawl_conf.pipelines.RankingPipeline': 250,
    'crawl_conf.pipelines.CrawlPipeline': 300,
+   'crawl_conf.pipelines.AbstractPipeline': 350,
+   'crawl_conf.pipelines.PdfDownloadPipeline': 400,
+   'crawl_conf.pipelines.PdfMiningPipeline': 450,
+   'crawl_conf.pipelines.JsonLinesStreamPipeline': 700,
+   'crawl_conf.pipelines.StreamingCsvPipeline': 800,
+   'crawl_conf.pipelines.DistributedItemPipeline': 900,
 }
 
+# Enrichment (citation count, topics, DOI) of the accepted papers, unless --nocrossref. The
+# providers are tried in this order: DOIs and titles a provider does not know, or that it fails
+# on, go to the next one ("openalex", "crossref", "semanticscholar", see providers.py).
+# Papers with a DOI are looked up in bulk: lookups wait up to ENRICH_BATCH_DELAY seconds to
+# fill a request of the first provider. A provider failing ENRICH_FAILURE_THRESHOLD times in a
+# row is skipped for ENRICH_COOLDOWN seconds. Requests time out after ENRICH_TIMEOUT seconds.
+ENRICH_PROVIDERS = ["openalex", "crossref"]
+ENRICH_BATCH_DELAY = 0.5
+ENRICH_FAILURE_THRESHOLD = 3
+ENRICH_COOLDOWN = 60
+ENRICH_TIMEOUT = 15
+# Retries of the Crossref and Semantic Scholar requests (OpenAlex: OPENALEX_MAX_RETRIES).
+ENRICH_MAX_RETRIES = 2
+
+# Base urls and rates of the providers, change the urls to test against a local stand-in
+# (e.g. mocksite.py: "http://127.0.0.1:8000/api.crossref.org/works").
+OPENALEX_URL = "https://api.openalex.org/works"
+CROSSREF_URL = "https://api.crossref.org/works"
+CROSSREF_RATE = 5
+CROSSREF_MAX_RATE = 10
+S2_URL = "https://api.semanticscholar.org/graph/v1"
+S2_API_KEY = None
+S2_RATE = 1
+S2_MAX_RATE = 1
+
+# OpenAlex enrichment. Requests go through an adaptive token bucket: the rate grows by
+# 0.5 req/s per success up to OPENALEX_MAX_RATE, halves on 429/5xx, and honours Retry-After.
+# Set OPENALEX_MAILTO (or `main.py -mailto`) to join OpenAlex's (and Crossref's) polite pool.
+OPENALEX_MAILTO = None
+OPENALEX_RATE = 5
+OPENALEX_MAX_RATE = 10
+OPENALEX_MAX_RETRIES = 5
+OPENALEX_BACKOFF = 1.0
+# Lookups run in the reactor thread pool, this is the number of lookups in flight.
+REACTOR_THREADPOOL_MAXSIZE = 10
+# Lookups already answered (or in flight for another spider) are shared, up to this many.
+OPENALEX_CACHE_SIZE = 1024
+
+# Hosts fetched over HTTP/2 when `main.py --http2` installs Http2HostsDownloadHandler for
+# https. Every other host keeps using HTTP/1.1. Needs the h2 package. Only requests made through
+# Scrapy's downloader are concerned: the OpenAlex lookups use their own pooled requests.Session.
+HTTP2_HOSTS = ["api.openreview.net", "api2.openreview.net"]
+
+# Base url of a running `mocksite.py` (e.g. "http://127.0.0.1:8000"). With `main.py -mocksite`
+# or `loadtest.py`, every request is sent to it instead of the real host (MockSiteDownloadHandler).
+MOCK_SITE_URL = None
+
+# ACM DL spiders (mm_acm, kdd, www_acm) can read each proceedings session through the citation
+# export endpoint, ACM_EXPORT_BATCH_SIZE papers per request, instead of visiting every article
+# page. Off by default: a batch the endpoint refuses, and an entry without a title, fall back to
+# the article pages.
+ACM_CITATION_EXPORT = False
+ACM_EXPORT_BATCH_SIZE = 50
+
+# Subscription mode (`main.py -queryfile`): a file of "label: query" lines, all evaluated for
+# every paper. Matching papers get the labels of every matching query.
+QUERY_FILE = None
+
+# Ranked mode (`main.py -rank K`): every crawled paper is scored with BM25 over title and
+# abstract, and the top K per query are written to RANK_OUTPUT. Needs numpy and scipy.
+RANK_TOP_K = 0
+RANK_OUTPUT = None
+
+# Listing-only mode (`main.py --no-abstract --fetchabstract`): fetch the abstracts of the papers
+# built from listing pages, only for those that passed the query.
+FETCH_ABSTRACTS = False
+
+# PDF download (`main.py -pdfdir DIR`): the PDFs of the accepted papers are stored in PDF_STORE
+# by content hash, with at most PDF_CONCURRENCY_PER_HOST downloads per host. 0 = no size limit.
+PDF_STORE = None
+PDF_CONCURRENCY_PER_HOST = 4
+PDF_MAX_SIZE = 0
+
+# PDF mining (`main.py -pdfdir DIR --minepdf`): repository urls are extracted from the first
+# PDF_MINING_PAGES pages of the downloaded PDFs in a pool of PDF_MINING_WORKERS processes
+# (0 = one per core) and added to code_url. Needs pypdf.
+PDF_MINING_ENABLED = False
+PDF_MINING_WORKERS = 0
+PDF_MINING_PAGES = 3
+
+# Streaming CSV output (enabled by `main.py --stream`). Rows are written to "<file>.part"
+# as they are accepted and the file is renamed to its final name when the crawl ends.
+STREAM_EXPORT_URI = None
+STREAM_FLUSH_ITEMS = 100
+STREAM_FLUSH_SECONDS = 10
+STREAM_BUFFER_SIZE = 64 * 1024
+# Write one file per conference-year, e.g. data_CVPR2023.csv
+STREAM_SHARD_BY_CONF = False
+
+# JSON Lines stream (`main.py -jsonl TARGET`): every accepted paper is written as one JSON
+# record, flushed right away, to stdout ("-"), a Unix socket ("unix:/path/to.sock") or a file,
+# renamed to <file>.1, <file>.2... every JSONL_ROTATE_BYTES (0 to never rotate). At most
+# JSONL_BUFFER_ITEMS records wait for a slow consumer, then the pipeline waits.
+JSONL_STREAM = None
+JSONL_ROTATE_BYTES = 100 * 1024 * 1024
+JSONL_BUFFER_ITEMS = 1000
+
+# Distributed mode (`main.py -distributed URL`): the scheduler queue and the seen fingerprints
+# of every spider live in a Redis server (or "memory://" for an in-process stand-in), and the
+# accepted papers are pushed to "<DISTRIBUTED_JOB>:items" for `collect.py`. A node stops a spider
+# once the shared queue has been empty for DISTRIBUTED_IDLE_TIMEOUT seconds. Needs redis-py.
+# The keys of a job expire DISTRIBUTED_TTL seconds after its last activity (0: never), so a job
+# name can be reused later; `main.py --reset` clears them at once.
+DISTRIBUTED_URL = None
+DISTRIBUTED_JOB = "crawl_conf"
+DISTRIBUTED_IDLE_TIMEOUT = 30
+DISTRIBUTED_TTL = 7 * 24 * 3600
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
@@ -2,3 +2,65 @@
 #
 # Please refer to the documentation for information on how to create and manage
 # your spiders.
+
+import importlib
+
+# Spider name -> "module:class". Only the spiders asked for in `-confs` are imported, instead
+# of Scrapy walking every spider module at start-up. Add new spiders here as well.
+SPIDERS = {
+    "cvpr": "crawl_conf.spiders.spiders:CvprScrapySpider",
+    "iccv": "crawl_conf.spiders.spiders:IccvScrapySpider",
+    "eccv": "crawl_conf.spiders.spiders:EccvScrapySpider",
+    "nips": "crawl_conf.spiders.spiders:NipsScrapySpider",
+    "ijcai": "crawl_conf.spiders.spiders:IjcaiScrapySpider",
+    "interspeech": "crawl_conf.spiders.spiders:InterspeechScrapySpider",
+    "iclr": "crawl_conf.spiders.spiders:IclrScrapySpider",
+    "icml": "crawl_conf.spiders.spiders:IcmlScrapySpider",
+    "mm_acm": "crawl_conf.spiders.spiders:MmScrapySpider",
+    "kdd": "crawl_conf.spiders.spiders:KddScrapySpider",
+    "www_acm": "crawl_conf.spiders.spiders:WwwAcmScrapySpider",
+    "acl": "crawl_conf.spiders.spiders:AclScrapySpider",
+    "emnlp": "crawl_conf.spiders.spiders:EmnlpScrapySpider",
+    "naacl": "crawl_conf.spiders.spiders:NaaclScrapySpider",
+    "mm": "crawl_conf.spiders.spiders:MultimediaScrapySpider",
+    "www": "crawl_conf.spiders.spiders:WwwScrapySpider",
+    "aaai": "crawl_conf.spiders.spiders:AaaiScrapySpider",
+    "icassp": "crawl_conf.spiders.spiders:IcasspScrapySpider",
+    "tpami": "crawl_conf.spiders.spiders:TpamiScrapySpider",
+    "nmi": "crawl_conf.spiders.spiders:NmiScrapySpider",
+    "pnas": "crawl_conf.spiders.spiders:PnasScrapySpider",
+    "ijcv": "crawl_conf.spiders.spiders:IjcvScrapySpider",
+    "taffc": "crawl_conf.spiders.spiders:TaffcScrapySpider",
+    "tip": "crawl_conf.spiders.spiders:TipScrapySpider",
+    "if": "crawl_conf.spiders.spiders:IfScrapySpider",
+    "tsp": "crawl_conf.spiders.spiders:TspScrapySpider",
+}
+
+
+def load_spider(name):
+    try:
+        module_name, class_name = SPIDERS[name].split(":")
+    except KeyError:
+        raise KeyError("Spider not found: {}".format(name))
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class LazySpiderLoader:
+    # Drop-in for Scrapy's SpiderLoader (SPIDER_LOADER_CLASS) backed by `SPIDERS`.
+
+    def __init__(self, settings):
+        self.settings = settings
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(settings)
+
+    def load(self, spider_name):
+        return load_spider(spider_name)
+
+    def list(self):
+        return list(SPIDERS)
+
+    def find_by_request(self, request):
+        # Only used by `scrapy shell` / `scrapy fetch`, so loading every spider is fine here.
+        return [name for name in SPIDERS if load_spider(name).handles_request(request)]
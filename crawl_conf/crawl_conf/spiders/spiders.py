@@ -6,11 +6,32 @@ import inspect
 
 # We import the Paper item we defined in `items.py`.
 from ..items import Paper
+from ..bibtex import bibtex_authors, latex_to_text, parse_bibtex
 
 import json
 
 class BaseSpider(scrapy.Spider):
 
+    # Scheduling priority of the requests handled by each callback (see `FrontierMiddleware`).
+    # Pages that discover more work come first, paper detail pages (priority 0) come last.
+    callback_priorities = {
+        "parse_day": 30,
+        "parse_session_list": 30,
+        "parse_paper_list": 20,
+        "parse_paper_list_for_openreview": 20,
+        "parse_citation_export": 10,
+        "parse_bibliography": 10,
+        "parse_paper": 0,
+    }
+
+    # Callbacks of the requests that fetch papers rather than discover them: a dry run
+    # (`main.py --plan`, see `PlanMiddleware`) counts these requests without sending them.
+    plan_callbacks = ("parse_paper", "parse_citation_export")
+
+    # Prefix of the conference names (e.g. "MM2023"). Defaults to the spider name, set it when
+    # two spiders crawl the same venue from different sources.
+    conf_name = None
+
     def __init__(self, *args, **kwargs):
         super(BaseSpider, self).__init__(*args, **kwargs)
 
@@ -20,16 +41,20 @@ class BaseSpider(scrapy.Spider):
         nocrossref = kwargs.get('nocrossref')
 
         # Remove repeated input
+        conf_name = (self.conf_name or self.name).upper()
         wanted_conf = []
         for year in years:
             if year not in wanted_conf:
-                wanted_conf.append(self.name.upper() + year)
+                wanted_conf.append(conf_name + year)
         self.wanted_conf = wanted_conf
         self.queries = queries
 
         # If not call Crossref API
-        if not nocrossref:
-            self.crossref = True
+        self.crossref = not nocrossref
+
+        # Listing-only mode: papers are built from the listing pages, paper pages are not fetched
+        # (by the spiders that implement `extract_listing`).
+        self.noabstract = bool(kwargs.get('noabstract'))
 
     def parse(self, response):
         raise NotImplementedError
@@ -38,11 +63,29 @@ class BaseSpider(scrapy.Spider):
     def extract_data(response):
         raise NotImplementedError
 
+    @staticmethod
+    def extract_listing(response):
+        # For the spiders whose listing pages already carry the title, authors and PDF link:
+        # yields (title, pdf_url, authors, abstract, detail_url) per paper of the page.
+        # The abstract is usually None, `detail_url` is the page to fetch it from later.
+        raise NotImplementedError
+
+    @staticmethod
+    def extract_doi(response):
+        # Most publishers (ACL Anthology, ACM DL, IJCAI, ...) expose the DOI in the page head.
+        # The pipeline uses it for an exact OpenAlex lookup instead of a fuzzy title search.
+        return response.xpath(
+            "//meta[@name='citation_doi']/@content | //meta[@name='dc.Identifier' and @scheme='doi']/@content").get(default="")
+
     def parse_paper(self, response):
         # Deliver the scraped item to `pipelines.py`.
         paper = Paper()
 
-        title, pdf_url, authors, abstract = self.extract_data(response)
+        data = self.extract_data(response)
+        if data is None:
+            # Not a paper of the conference (e.g. an ICML workshop page).
+            return
+        title, pdf_url, authors, abstract = data
         conf = response.meta['conf']
 
         if abstract is not None:
@@ -53,9 +96,22 @@ class BaseSpider(scrapy.Spider):
         paper["pdf_url"] = pdf_url
         paper["authors"] = authors
         paper["abstract"] = abstract
+        paper["doi"] = response.meta.get('doi') or self.extract_doi(response)
 
         yield paper
 
+    def listing_paper(self, conf, title, pdf_url, authors, abstract, detail_url):
+        # A paper built from a listing page (--no-abstract), see `extract_listing`.
+        paper = Paper()
+        paper["conf"] = conf
+        paper["title"] = title
+        paper["pdf_url"] = pdf_url
+        paper["authors"] = authors
+        paper["abstract"] = abstract
+        paper["detail_url"] = detail_url
+        paper["doi"] = ""
+        return paper
+
 
 class CvprScrapySpider(BaseSpider):
     # The name differentiate this crawler class against others. Try to
@@ -111,6 +167,13 @@ class CvprScrapySpider(BaseSpider):
 
     def parse_paper_list(self, response):
         meta = {"conf": response.meta['conf']}
+
+        if self.noabstract:
+            # The listing already has the titles, authors and PDF links.
+            for row in self.extract_listing(response):
+                yield self.listing_paper(meta['conf'], *row)
+            return
+
         # Now we have all the papers.
         paper_url_list = response.xpath("//div[@id='content']/dl/dt[@class='ptitle']/a/@href").extract()
 
@@ -135,6 +198,20 @@ class CvprScrapySpider(BaseSpider):
 
         return title, pdf_url, authors, abstract
 
+    @staticmethod
+    def extract_listing(response):
+        # Every paper is a <dt class="ptitle"> followed by a <dd> of authors and a <dd> of links.
+        for entry in response.xpath("//div[@id='content']/dl/dt[@class='ptitle']"):
+            title = entry.xpath("./a/text()").get()
+            if title is None:
+                continue
+            authors = tuple(author.strip() for author in
+                            entry.xpath("./following-sibling::dd[1]//input[@name='query_author']/@value").extract())
+            pdf_url = response.urljoin(entry.xpath("./following-sibling::dd[2]/a[1]/@href").get())
+            detail_url = response.urljoin(entry.xpath("./a/@href").get())
+
+            yield inspect.cleandoc(title), pdf_url, authors, None, detail_url
+
 
 class IccvScrapySpider(CvprScrapySpider):
     name = 'iccv'
@@ -160,6 +237,20 @@ class EccvScrapySpider(CvprScrapySpider):
             year = conf[4:]
             paper_url_list = response.xpath(f"//button[contains(text(), {year})]/following-sibling::div[1]/div[@id='content']/dl/dt/a/@href").extract()
             meta = {"conf": conf}
+
+            if self.noabstract:
+                entries = response.xpath(f"//button[contains(text(), {year})]/following-sibling::div[1]/div[@id='content']/dl/dt")
+                for entry in entries:
+                    title = entry.xpath("./a/text()").get()
+                    if title is None:
+                        continue
+                    authors = tuple(author.strip() for author in
+                                    entry.xpath("./following-sibling::dd[1]/text()").get(default="").split(","))
+                    pdf_url = self.base_url + "/" + entry.xpath("./following-sibling::dd[2]/a[1]/@href").get(default="")
+                    detail_url = self.base_url + "/" + entry.xpath("./a/@href").get()
+                    yield self.listing_paper(conf, inspect.cleandoc(title), pdf_url, authors, None, detail_url)
+                continue
+
             for paper_url in paper_url_list:
                 url = self.base_url + "/" + paper_url
                 yield scrapy.Request(url, callback=self.parse_paper, meta=meta)
@@ -296,6 +387,12 @@ class IjcaiScrapySpider(BaseSpider):
 
     def parse_paper_list(self, response):
         meta = {"conf": response.meta['conf']}
+
+        if self.noabstract:
+            for row in self.extract_listing(response):
+                yield self.listing_paper(meta['conf'], *row)
+            return
+
         paper_url_list = response.xpath("//div[@class='paper_wrapper']/div[@class='details']/a[2]/@href").extract()
 
         for paper_url in paper_url_list:
@@ -313,6 +410,18 @@ class IjcaiScrapySpider(BaseSpider):
 
         return title, pdf_url, authors, abstract
 
+    @staticmethod
+    def extract_listing(response):
+        for entry in response.xpath("//div[@class='paper_wrapper']"):
+            title = entry.xpath("./div[@class='title']/text()").get()
+            if title is None:
+                continue
+            authors = inspect.cleandoc(entry.xpath("./div[@class='authors']/text()").get(default=""))
+            pdf_url = response.urljoin(entry.xpath("./div[@class='details']/a[1]/@href").get())
+            detail_url = response.urljoin(entry.xpath("./div[@class='details']/a[2]/@href").get())
+
+            yield inspect.cleandoc(title), pdf_url, authors, None, detail_url
+
 
 class InterspeechScrapySpider(BaseSpider):
     name = 'interspeech'
@@ -333,6 +442,12 @@ class InterspeechScrapySpider(BaseSpider):
 
     def parse_paper_list(self, response):
         meta = {"conf": response.meta['conf']}
+
+        if self.noabstract:
+            for row in self.extract_listing(response):
+                yield self.listing_paper(meta['conf'], *row)
+            return
+
         paper_url_list = [u for u in response.xpath("//a[@class='w3-text']/@href").extract() if not u.startswith("#")]
 
         for paper_url in paper_url_list:
@@ -350,6 +465,20 @@ class InterspeechScrapySpider(BaseSpider):
 
         return title, pdf_url, authors, abstract
 
+    @staticmethod
+    def extract_listing(response):
+        # <a class="w3-text" href="xxx_interspeech.html"><p>Title<br><span>Authors</span></p></a>
+        for entry in response.xpath("//a[@class='w3-text']"):
+            href = entry.xpath("./@href").get(default="")
+            title = " ".join(entry.xpath("./p/text()").get(default="").split())
+            if href.startswith("#") or not title:
+                continue
+            authors = inspect.cleandoc(entry.xpath("./p/span/text()").get(default=""))
+            detail_url = response.url.replace("index.html", href)
+            pdf_url = detail_url.replace(detail_url[-4:], "pdf")
+
+            yield title, pdf_url, authors, None, detail_url
+
 
 class IclrScrapySpider(BaseSpider):
     name = 'iclr'
@@ -455,12 +584,12 @@ class IclrScrapySpider(BaseSpider):
 
         if year <= "2023":
             title = inspect.cleandoc(item['content']['title'])
-            authors = inspect.cleandoc(",".join(item['content']['authors']))
+            authors = tuple(author.strip() for author in item['content']['authors'])
             abstract = inspect.cleandoc(item['content']['abstract'])
             pdf_id = item['content']['pdf']
         else:
             title = inspect.cleandoc(item['content']['title']['value'])
-            authors = inspect.cleandoc(",".join(item['content']['authors']['value']))
+            authors = tuple(author.strip() for author in item['content']['authors']['value'])
             abstract = inspect.cleandoc(item['content']['abstract']['value'])
             pdf_id = item['content']['pdf']['value']
 
@@ -477,11 +606,40 @@ class IcmlScrapySpider(BaseSpider):
 
     from_dblp = False
 
+    # The ICML proceedings are PMLR volumes. Their bibliography.bib has the title, authors,
+    # abstract and PDF of every paper of the main conference, so a whole year is one request.
+    # Years missing here are crawled paper by paper from icml.cc.
+    pmlr_url = "https://proceedings.mlr.press/v{volume}/assets/bib/bibliography.bib"
+    pmlr_volumes = {
+        "2013": 28, "2014": 32, "2015": 37, "2016": 48, "2017": 70, "2018": 80, "2019": 97,
+        "2020": 119, "2021": 139, "2022": 162, "2023": 202, "2024": 235, "2025": 267,
+    }
+
     def parse(self, response):
         for conf in self.wanted_conf:
             meta = {"conf": conf}
-            url = response.urljoin(response.url + "/" + conf[4:])
-            yield scrapy.Request(url, callback=self.parse_paper_list, meta=meta)
+            year = conf[4:]
+            if year in self.pmlr_volumes:
+                url = self.pmlr_url.format(volume=self.pmlr_volumes[year])
+                yield scrapy.Request(url, callback=self.parse_bibliography, meta=meta)
+            else:
+                url = response.urljoin(response.url + "/" + year)
+                yield scrapy.Request(url, callback=self.parse_paper_list, meta=meta)
+
+    def parse_bibliography(self, response):
+        for entry in parse_bibtex(response.text):
+            if entry["ENTRYTYPE"] != "inproceedings" or "title" not in entry:
+                continue
+
+            paper = Paper()
+            paper["conf"] = response.meta['conf']
+            paper["title"] = latex_to_text(entry["title"])
+            paper["authors"] = tuple(bibtex_authors(entry.get("author", "")))
+            paper["abstract"] = latex_to_text(entry.get("abstract", ""))
+            paper["pdf_url"] = entry.get("pdf", "")
+            paper["doi"] = ""
+
+            yield paper
 
     def parse_paper_list(self, response):
         meta = {"conf": response.meta['conf']}
@@ -511,7 +669,9 @@ class IcmlScrapySpider(BaseSpider):
 
 
 class MmScrapySpider(BaseSpider):
-    name = 'mm'
+    # ACM MM from the ACM DL. `mm` crawls it from dblp (see `MultimediaScrapySpider`).
+    name = 'mm_acm'
+    conf_name = 'mm'
 
     start_urls = [
         "https://dl.acm.org/conference/mm/proceedings",
@@ -560,17 +720,74 @@ class MmScrapySpider(BaseSpider):
         meta = {"conf": response.meta['conf']}
         doi_list = response.xpath("//div[@class='issue-item clearfix']/div/div/h5/a/@href").extract()
 
-        for doi in doi_list:
-            url = self.base_url + doi
-            yield scrapy.Request(url, callback=self.parse_paper, meta=meta)
+        # The article href is "/doi/<doi>", so the DOI is known before visiting the page.
+        dois = [doi.split("/doi/")[-1] for doi in doi_list]
+
+        if self.settings.getbool("ACM_CITATION_EXPORT"):
+            # Fetch the citations of the whole session through ACM's export endpoint,
+            # a few requests per session instead of one request per article page.
+            batch_size = self.settings.getint("ACM_EXPORT_BATCH_SIZE", 50)
+            for i in range(0, len(dois), batch_size):
+                batch = dois[i:i + batch_size]
+                formdata = {"dois": ",".join(batch), "targetFile": "custom-bibtex", "format": "bibTex"}
+                yield scrapy.FormRequest(self.base_url + "/action/exportCiteProcCitation", formdata=formdata,
+                                         callback=self.parse_citation_export, errback=self.export_failed,
+                                         meta={**meta, "papers": len(batch), "dois": batch})
+            return
+
+        yield from self.article_requests(dois, meta)
+
+    def article_requests(self, dois, meta):
+        for doi in dois:
+            yield scrapy.Request(self.base_url + "/doi/" + doi, callback=self.parse_paper, meta={**meta, "doi": doi})
+
+    def export_failed(self, failure):
+        # The export endpoint refused the batch: visit its article pages instead.
+        request = failure.request
+        self.logger.warning("Citation export failed (%s), falling back to the article pages", failure.getErrorMessage())
+        yield from self.article_requests(request.meta["dois"], {"conf": request.meta["conf"]})
+
+    def parse_citation_export(self, response):
+        # The export is CSL-JSON: {"items": [{"<doi>": {"title": ..., "author": [...], "abstract": ..., "DOI": ...}}, ...]}
+        meta = {"conf": response.meta['conf']}
+        try:
+            received_data = json.loads(response.text)
+        except ValueError:
+            self.logger.warning("Citation export is not JSON, falling back to the article pages: %s", response.url)
+            yield from self.article_requests(response.meta["dois"], meta)
+            return
+
+        for entry in received_data.get('items', []):
+            for doi, citation in entry.items():
+                if not citation.get('title'):
+                    # An incomplete entry: read the article page instead.
+                    yield from self.article_requests([citation.get('DOI', doi)], meta)
+                    continue
+                authors = [" ".join(part for part in (author.get('given'), author.get('family')) if part)
+                           for author in citation.get('author', [])]
+                abstract = citation.get('abstract')
+                if abstract is not None:
+                    # Drop the <p> tags and collapse the whitespace left behind.
+                    abstract = " ".join(re.sub(r'<[^>]+>', ' ', abstract).split())
+                doi = citation.get('DOI', doi)
+
+                paper = Paper()
+                paper["conf"] = response.meta['conf']
+                paper["title"] = citation.get('title')
+                paper["authors"] = tuple(authors)
+                paper["abstract"] = abstract
+                paper["pdf_url"] = self.base_url + "/doi/pdf/" + doi
+                paper["doi"] = doi
+
+                yield paper
 
     @staticmethod
     def extract_data(response):
 
         title = response.xpath("//div[@class='article-citations']/div[@class='citation']/div[@class='border-bottom clearfix']/h1/text()").get()
 
-        authors = inspect.cleandoc(",".join(response.xpath(
-            "//div[@class='article-citations']/div[@class='citation']/div[@class='border-bottom clearfix']/div[@id='sb-1']/ul/li[@class='loa__item']/a/@title").extract()))
+        authors = tuple(author.strip() for author in response.xpath(
+            "//div[@class='article-citations']/div[@class='citation']/div[@class='border-bottom clearfix']/div[@id='sb-1']/ul/li[@class='loa__item']/a/@title").extract())
 
         abstract = inspect.cleandoc(response.xpath("//div[@class='abstractSection abstractInFull']/p/text()").get())
 
@@ -580,6 +797,7 @@ class MmScrapySpider(BaseSpider):
 
 class KddScrapySpider(MmScrapySpider):
     name = 'kdd'
+    conf_name = 'kdd'
 
     start_urls = [
         "https://dl.acm.org/conference/kdd/proceedings",
@@ -603,17 +821,10 @@ class KddScrapySpider(MmScrapySpider):
             yield scrapy.Request(url, callback=self.parse_session_list, meta=meta)
 
 
-    def parse_paper_list(self, response):
-        meta = {"conf": response.meta['conf']}
-        doi_list = response.xpath("//div[@class='issue-item clearfix']/div/div/h5/a/@href").extract()
-
-        for doi in doi_list:
-            url = self.base_url + doi
-            yield scrapy.Request(url, callback=self.parse_paper, meta=meta)
-
-
-class WwwScrapySpider(MmScrapySpider):
-    name = 'www'
+class WwwAcmScrapySpider(MmScrapySpider):
+    # WWW from the ACM DL. `www` crawls it from dblp.
+    name = 'www_acm'
+    conf_name = 'www'
 
     start_urls = [
         "https://dl.acm.org/conference/www/proceedings",
@@ -638,15 +849,6 @@ class WwwScrapySpider(MmScrapySpider):
             yield scrapy.Request(url, callback=self.parse_session_list, meta=meta)
 
 
-    def parse_paper_list(self, response):
-        meta = {"conf": response.meta['conf']}
-        doi_list = response.xpath("//div[@class='issue-item clearfix']/div/div/h5/a/@href").extract()
-
-        for doi in doi_list:
-            url = self.base_url + doi
-            yield scrapy.Request(url, callback=self.parse_paper, meta=meta)
-
-
 class AclScrapySpider(BaseSpider):
     name = 'acl'
 
@@ -671,6 +873,12 @@ class AclScrapySpider(BaseSpider):
 
     def parse_paper_list(self, response):
         meta = {"conf": response.meta['conf']}
+
+        if self.noabstract:
+            for row in self.extract_listing(response):
+                yield self.listing_paper(meta['conf'], *row)
+            return
+
         paper_urls = response.xpath(
             "//section[@id='main']//p[contains(@class, 'd-sm-flex align-items-stretch')][position() >= 2]//strong/a/@href").extract()
 
@@ -682,11 +890,29 @@ class AclScrapySpider(BaseSpider):
     def extract_data(response):
         title = re.sub(r'<[^>]+>', '', response.xpath("//section[@id='main']/div/h2[@id='title']").get())
 
-        authors = ",".join([author for author in response.xpath("//section[@id='main']/div/p[@class='lead']//a/text()").extract()])
+        authors = tuple(response.xpath("//section[@id='main']/div/p[@class='lead']//a/text()").extract())
         abstract = response.xpath("//div[contains(@class, 'acl-abstract')]/span/text()").get()
         pdf_url = response.xpath("//div[contains(@class, 'acl-paper-link-block')]/a[contains(@class, 'btn-primary')]/@href").get()
         return title, pdf_url, authors, abstract
 
+    @staticmethod
+    def extract_listing(response):
+        # The volume page even has the abstracts, in the collapsed block following each entry.
+        entries = response.xpath(
+            "//section[@id='main']//p[contains(@class, 'd-sm-flex align-items-stretch')][position() >= 2]")
+        for entry in entries:
+            link = entry.xpath(".//strong/a")
+            if not link:
+                continue
+            title = re.sub(r'<[^>]+>', '', link.get())
+            authors = tuple(entry.xpath("./span[last()]/a/text()").extract())
+            pdf_url = entry.xpath(".//a[contains(@class, 'badge-primary')]/@href").get()
+            abstract = " ".join(" ".join(entry.xpath(
+                "./following-sibling::*[1][contains(@class, 'abstract-collapse')]//text()").extract()).split()) or None
+            detail_url = response.urljoin(link.xpath("./@href").get())
+
+            yield title, pdf_url, authors, abstract, detail_url
+
 
 class EmnlpScrapySpider(AclScrapySpider):
     name = "emnlp"
@@ -737,10 +963,14 @@ class DblpScrapySpider(BaseSpider):
         numbers = response.xpath("//div[@id='main']//ul[@class='publ-list']")
 
         for number in numbers:
-            titles = number.xpath(".//cite[@class='data tts-content']//span[@class='title']/text()").extract()
-            for i, title in enumerate(titles):
-
-                authors = ",".join(number.xpath(".//cite[@class='data tts-content']")[i].xpath(".//span[@itemprop='author']/a//text()").extract())
+            for entry in number.xpath("./li[contains(@class, 'entry')]"):
+                title = entry.xpath(".//cite[@class='data tts-content']//span[@class='title']/text()").get()
+                if title is None:
+                    continue
+
+                authors = tuple(entry.xpath(".//cite[@class='data tts-content']//span[@itemprop='author']/a//text()").extract())
+                # The "electronic edition" links of an entry include its doi.org url when one exists.
+                doi_url = entry.xpath(".//nav[@class='publ']//a[starts-with(@href, 'https://doi.org/')]/@href").get(default="")
                 # Deliver the scraped item to `pipelines.py`.
 
                 paper = Paper()
@@ -749,6 +979,7 @@ class DblpScrapySpider(BaseSpider):
                 paper["authors"] = authors
                 paper["pdf_url"] = ""
                 paper["abstract"] = ""
+                paper["doi"] = doi_url.replace("https://doi.org/", "")
 
                 yield paper
 
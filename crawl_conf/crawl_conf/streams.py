@@ -0,0 +1,139 @@
+import json
+import logging
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+def paper_record(item):
+    # One JSON Lines record: the paper's fields, with the tuples and lists (authors, categories,
+    # matched_queries...) as arrays. Only the CSV writers join them with commas. An `authors`
+    # string, from a site that gives the authors as one text, is sent as is.
+    record = {}
+    for field, value in item.items():
+        if isinstance(value, tuple):
+            value = list(value)
+        record[field] = value
+    return json.dumps(record, ensure_ascii=False, default=str) + "\n"
+
+
+class StdoutSink:
+    def write(self, line):
+        sys.stdout.write(line)
+        sys.stdout.flush()
+
+    def close(self):
+        pass
+
+
+class RotatingFileSink:
+    """Appends to PATH. Past `max_bytes`, PATH is renamed to PATH.1 (then PATH.2...) and a new
+    PATH is started, so a consumer can index the numbered files as soon as they appear."""
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, line):
+        self.file.write(line)
+        self.file.flush()
+        if self.max_bytes and self.file.tell() >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        self.file.close()
+        number = 1
+        while os.path.exists("{}.{}".format(self.path, number)):
+            number += 1
+        os.replace(self.path, "{}.{}".format(self.path, number))
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self.file.close()
+
+
+class UnixSocketSink:
+    """Sends the records to a consumer listening on a Unix socket, reconnecting if it restarts.
+
+    A record that cannot be delivered after `retries` reconnections is dropped (and logged).
+    """
+
+    def __init__(self, path, retries=5):
+        self.path = path
+        self.retries = retries
+        self.sock = None
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        self.sock = sock
+
+    def write(self, line):
+        data = line.encode("utf-8")
+        for attempt in range(self.retries + 1):
+            try:
+                if self.sock is None:
+                    self.connect()
+                self.sock.sendall(data)
+                return
+            except OSError as e:
+                self.close()
+                if attempt == self.retries:
+                    logger.error("Dropped a record, cannot write to %s: %s", self.path, e)
+                    return
+                time.sleep(min(2 ** attempt * 0.1, 5))
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+def open_sink(target, max_bytes=0):
+    # "-" is stdout, "unix:/path/to.sock" a Unix socket, anything else a file.
+    if target == "-":
+        return StdoutSink()
+    if target.startswith("unix:"):
+        return UnixSocketSink(target[len("unix:"):])
+    return RotatingFileSink(target, max_bytes)
+
+
+class StreamWriter(threading.Thread):
+    """Writes the records handed to `put` to a sink from its own thread, one flush per record.
+
+    At most `buffer_items` records wait in memory: past that, `put` blocks, which holds the
+    items in the pipeline until the consumer catches up instead of buffering without bound.
+    """
+
+    _closed = object()
+
+    def __init__(self, sink, buffer_items):
+        super().__init__(name="jsonl-stream", daemon=True)
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=buffer_items)
+
+    def full(self):
+        return self.queue.full()
+
+    def put(self, line):
+        self.queue.put(line)
+
+    def run(self):
+        while True:
+            line = self.queue.get()
+            if line is self._closed:
+                break
+            try:
+                self.sink.write(line)
+            except Exception:
+                logger.exception("Cannot write a record to the stream")
+        self.sink.close()
+
+    def close(self):
+        self.queue.put(self._closed)
+        self.join()
@@ -0,0 +1,112 @@
+"""Measure the throughput of a whole crawl against the local copy of the websites (`mocksite.py`).
+
+Starts mocksite.py in a separate process, so the server does not compete with the crawl for the
+GIL, runs the spiders through the full engine (scheduler, downloader, callbacks, pipelines, CSV
+exporter) against it, and prints the pages and items per second of every spider and of the run.
+
+    python loadtest.py -confs cvpr,aaai,acl,iclr -years 2023 -papers 50000 -latency 0.05
+
+With -enrich, the papers are also enriched through the mock's copies of the provider APIs
+(e.g. -enrich openalex,crossref), otherwise the run is --nocrossref.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+
+def wait_for_port(port, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("mocksite.py did not start on port {}".format(port))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Load test the crawler against a local copy of the websites.')
+    parser.add_argument('-confs', default="cvpr,aaai,acl,iclr", type=str, help='The spiders to run (cvpr, iccv, iclr, acl, emnlp, naacl and the dblp ones)')
+    parser.add_argument('-years', default="2023", type=str, help='The years to crawl')
+    parser.add_argument('-queries', default="", type=str, help='The queries (default: keep every paper)')
+    parser.add_argument('-papers', default=1000, type=int, help='Number of papers of every conference-year')
+    parser.add_argument('-latency', default=0.0, type=float, help='Mean response time of the mock in seconds')
+    parser.add_argument('-errors', default=0.0, type=float, help='Share of the requests the mock answers with a 500 error')
+    parser.add_argument('-out', default='loadtest.csv', type=str, help='The CSV file the papers are written to')
+    parser.add_argument('-enrich', default=None, type=str, help='Enrich the papers through these providers of the mock, e.g. "openalex,crossref,semanticscholar"')
+    parser.add_argument('--no-abstract', action='store_true', help='Build the papers from the listing pages')
+
+    args = parser.parse_args()
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "mocksite.py"),
+                               "-port", str(port), "-papers", str(args.papers),
+                               "-latency", str(args.latency), "-errors", str(args.errors)])
+    try:
+        wait_for_port(port)
+
+        setting = get_project_settings()
+        handler = 'crawl_conf.handlers.MockSiteDownloadHandler'
+        mock_url = "http://127.0.0.1:{}".format(port)
+        setting.set('MOCK_SITE_URL', mock_url)
+        if args.enrich:
+            setting.set('ENRICH_PROVIDERS', args.enrich)
+            setting.set('OPENALEX_URL', mock_url + "/api.openalex.org/works")
+            setting.set('CROSSREF_URL', mock_url + "/api.crossref.org/works")
+            setting.set('S2_URL', mock_url + "/api.semanticscholar.org/graph/v1")
+        setting.set('DOWNLOAD_HANDLERS', {'http': handler, 'https': handler})
+        # All the spiders append to the same file, as with main.py.
+        if os.path.exists(args.out):
+            os.remove(args.out)
+        setting.set('FEED_FORMAT', 'csv')
+        setting.set('FEED_URI', args.out)
+        setting.set('QUARANTINE_DIR', None)
+        setting.set('LOG_LEVEL', 'WARNING')
+
+        process = CrawlerProcess(setting)
+        crawlers = []
+        for conf in args.confs.split(","):
+            conf = conf.strip()
+            if conf:
+                crawler = process.create_crawler(conf)
+                crawlers.append(crawler)
+                process.crawl(crawler, years=args.years, queries=args.queries, nocrossref=not args.enrich,
+                              noabstract=args.no_abstract)
+
+        started = time.monotonic()
+        process.start()
+        elapsed = time.monotonic() - started
+    finally:
+        server.terminate()
+        server.wait()
+
+    print("{:<10} {:>9} {:>9} {:>8} {:>10} {:>10}".format("spider", "pages", "items", "errors", "pages/s", "items/s"))
+    total_pages = total_items = 0
+    for crawler in crawlers:
+        stats = crawler.stats.get_stats()
+        pages = stats.get("response_received_count", 0)
+        items = stats.get("item_scraped_count", 0)
+        errors = stats.get("downloader/response_status_count/500", 0)
+        seconds = stats.get("elapsed_time_seconds") or elapsed
+        print("{:<10} {:>9} {:>9} {:>8} {:>10.1f} {:>10.1f}".format(
+            crawler.spider.name, pages, items, errors, pages / seconds, items / seconds))
+        total_pages += pages
+        total_items += items
+    print("{:<10} {:>9} {:>9} {:>8} {:>10.1f} {:>10.1f}".format(
+        "total", total_pages, total_items, "", total_pages / elapsed, total_items / elapsed))
+    print("{:.1f} s, {} papers per conference-year, {:g} s mean latency, {:.0%} errors".format(
+        elapsed, args.papers, args.latency, args.errors))
@@ -1,6 +1,7 @@
 from scrapy.utils.project import get_project_settings
 from scrapy.crawler import CrawlerProcess
 import argparse
+import os
 
 if __name__ == "__main__":
 
@@ -9,8 +10,29 @@ if __name__ == "__main__":
                         help='What years you want to crawl?')
     parser.add_argument('-years', default="2016,2017,2018,2019,2020,2021,2022,2023,2024", type=str, help='What years you want to crawl?')
     parser.add_argument('-queries', default="relation, relationship,correlate,correlation", type=str, help='What keywords you want to query?')
+    parser.add_argument('-queryfile', default=None, type=str, help='A file of "label: query" lines, all evaluated in one crawl (overrides -queries)')
+    parser.add_argument('-rank', default=0, type=int, help='Also write the top-k papers per query, ranked by BM25 over title and abstract, to <out>_ranked.csv')
     parser.add_argument('-out', default=None, type=str, help='Specify the output path as /path/to/filename.csv')
+    parser.add_argument('-pdfdir', default=None, type=str, help='Download the PDFs of the matched papers into this directory')
+    parser.add_argument('--minepdf', action='store_true', help='With -pdfdir, also look for code urls in the first pages of the PDFs')
+    parser.add_argument('--no-abstract', action='store_true', help='Build the papers from the listing pages, without fetching the paper pages (faster, but no abstracts)')
+    parser.add_argument('--fetchabstract', action='store_true', help='With --no-abstract, fetch the abstracts of the papers that match the queries')
     parser.add_argument('--nocrossref', action='store_true', help='Do not request extra details through API call from Crossref')
+    parser.add_argument('-providers', default=None, type=str, help='The enrichment services to use, in fallback order, e.g. "openalex,crossref,semanticscholar"')
+    parser.add_argument('-mailto', default=None, type=str, help='Your email address, sent to OpenAlex to use its polite pool')
+    parser.add_argument('--stream', action='store_true', help='Stream rows to the output file as they are scraped, with periodic flushes')
+    parser.add_argument('--shard', action='store_true', help='With --stream, write one output file per conference-year')
+    parser.add_argument('-jsonl', default=None, type=str, help='Also stream the papers as JSON Lines, as they are accepted, to stdout ("-"), a Unix socket ("unix:/path/to.sock") or a file')
+    parser.add_argument('-distributed', default=None, type=str, help='Share the crawl frontier with other nodes through this Redis url (memory:// for an in-process stand-in)')
+    parser.add_argument('-job', default='crawl_conf', type=str, help='With -distributed, the name shared by all the nodes of one crawl')
+    parser.add_argument('-nodes', default=1, type=int, help='With -distributed, run this many crawlers per conference in this process')
+    parser.add_argument('--reset', action='store_true', help='With -distributed, first clear the queue, seen requests and uncollected papers a previous run of this -job left')
+    parser.add_argument('--profile', action='store_true', help='Profile the spiders and pipelines, and write a report and a flamegraph file per spider to <out>_profile/')
+    parser.add_argument('--http2', action='store_true', help='Use HTTP/2 for the OpenReview APIs (requires h2)')
+    parser.add_argument('-loglevel', default=None, type=str, help='Log level of the console, e.g. DEBUG to see every request (default: INFO)')
+    parser.add_argument('-logjson', default=None, type=str, help='Also write the log as JSON Lines to this file, with the paper counts per venue')
+    parser.add_argument('-mocksite', default=None, type=str, help='Crawl the local copy of the websites served by mocksite.py at this url, e.g. http://127.0.0.1:8000')
+    parser.add_argument('--plan', action='store_true', help='Dry run: crawl the listing pages only, and print the number of paper pages and OpenAlex lookups per conference-year with an estimated duration')
 
     args = parser.parse_args()
 
@@ -18,31 +40,108 @@ if __name__ == "__main__":
     years = args.years
     queries = args.queries
     nocrossref = args.nocrossref
+    noabstract = args.no_abstract
 
     # ------------------------------------------------------------
     # Get default Scrapy settings and instantiate a CrawlerProcess
     # ------------------------------------------------------------
     setting = get_project_settings()
+    # Logging is configured when the CrawlerProcess is created, so these are set before.
+    if args.loglevel is not None:
+        setting.set('LOG_LEVEL', args.loglevel.upper())
+    if args.logjson is not None:
+        setting.set('LOG_JSON_FILE', args.logjson)
     process = CrawlerProcess(setting)
 
-    # You have set some feed-output settings
-    process.settings.set('FEED_FORMAT', 'csv')          # or 'csv', 'xml', etc.
-    process.settings.set('FEED_URI', 'data.csv')        # default output file name
+    if args.mailto is not None:
+        process.settings.set('OPENALEX_MAILTO', args.mailto)
 
-    if args.out is not None:
-        # If user specified an output path, override the default
-        process.settings.set('FEED_URI', args.out)
+    if args.providers is not None:
+        process.settings.set('ENRICH_PROVIDERS', args.providers)
+
+    if args.queryfile is not None:
+        # Every paper gets the labels of all the queries it matches, next to the matched keywords.
+        process.settings.set('QUERY_FILE', args.queryfile)
+        fields = process.settings.getlist('FEED_EXPORT_FIELDS')
+        fields.insert(fields.index('matched_queries') + 1, 'labels')
+        process.settings.set('FEED_EXPORT_FIELDS', fields)
+
+    output = args.out if args.out is not None else 'data.csv'    # default output file name
+
+    if args.fetchabstract:
+        process.settings.set('FETCH_ABSTRACTS', True)
+
+    if args.pdfdir is not None:
+        process.settings.set('PDF_STORE', args.pdfdir)
+        process.settings.set('PDF_MINING_ENABLED', args.minepdf)
+
+    if args.rank > 0:
+        process.settings.set('RANK_TOP_K', args.rank)
+        process.settings.set('RANK_OUTPUT', os.path.splitext(output)[0] + '_ranked.csv')
+
+    if args.http2:
+        process.settings.set('DOWNLOAD_HANDLERS', {'https': 'crawl_conf.handlers.Http2HostsDownloadHandler'})
+
+    if args.jsonl is not None:
+        process.settings.set('JSONL_STREAM', args.jsonl)
+
+    if args.mocksite is not None:
+        process.settings.set('MOCK_SITE_URL', args.mocksite)
+        handler = 'crawl_conf.handlers.MockSiteDownloadHandler'
+        process.settings.set('DOWNLOAD_HANDLERS', {'http': handler, 'https': handler})
+
+    if args.profile:
+        process.settings.set('PROFILE_DIR', os.path.splitext(output)[0] + '_profile')
+
+    if args.plan:
+        # Nothing is scraped, so no output file is written (and an existing one is left alone).
+        process.settings.set('CRAWL_PLAN', True)
+    elif args.distributed is not None:
+        # Requests and seen fingerprints live in the shared store, papers are pushed to it
+        # and gathered by collect.py (or at the end of this run for memory://).
+        process.settings.set('DISTRIBUTED_URL', args.distributed)
+        process.settings.set('DISTRIBUTED_JOB', args.job)
+        process.settings.set('SCHEDULER', 'crawl_conf.distributed.DistributedScheduler')
+        if args.reset:
+            # Run only on the first node: the others would wipe what it has queued already.
+            from crawl_conf.distributed import get_store, reset_job
+            reset_job(get_store(args.distributed), args.job, [conf.strip() for conf in confs.split(",") if conf.strip()])
+    elif args.stream:
+        # Rows are written by StreamingCsvPipeline instead of the feed exporter.
+        process.settings.set('STREAM_EXPORT_URI', output)
+        process.settings.set('STREAM_SHARD_BY_CONF', args.shard)
+    else:
+        # You have set some feed-output settings
+        process.settings.set('FEED_FORMAT', 'csv')          # or 'csv', 'xml', etc.
+        process.settings.set('FEED_URI', output)
 
 
     # ------------------------------------------------------------
     # Now queue up the crawls for each requested conference
     # ------------------------------------------------------------
     for conf in confs.split(","):
-        process.crawl(
-            conf,
-            years=years,
-            queries=queries,
-            nocrossref=nocrossref,
-        )
+        conf = conf.strip()
+        if not conf:
+            continue
+
+        # The spider class is imported only now (see SPIDERS in crawl_conf/spiders/__init__.py).
+        for _ in range(args.nodes if args.distributed is not None else 1):
+            process.crawl(
+                conf,
+                years=years,
+                queries=queries,
+                nocrossref=nocrossref,
+                noabstract=noabstract,
+            )
 
     process.start()
+
+    if args.plan:
+        from crawl_conf.middlewares import PlanMiddleware
+        if PlanMiddleware.plan is not None:
+            print(PlanMiddleware.plan.report(process.settings, crossref=not nocrossref))
+
+    if args.distributed is not None and args.distributed.startswith('memory://'):
+        # Nothing outside this process can reach the in-process store, so gather the papers here.
+        from crawl_conf.distributed import drain_items, get_store
+        drain_items(get_store(args.distributed), args.job, output, process.settings.getlist('FEED_EXPORT_FIELDS'))
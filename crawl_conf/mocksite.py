@@ -0,0 +1,352 @@
+"""A local, synthetic copy of the conference websites, for load tests that touch no real site.
+
+Serves the pages the spiders walk through, generated on the fly:
+
+- CVF (cvpr, iccv): menu, day list, paper list and paper pages of openaccess.thecvf.com.
+- dblp (aaai, mm, www, icassp, tpami, ijcv...): venue index and table of contents pages.
+- OpenReview (iclr): the notes JSON of api.openreview.net (2017-2023) and api2.openreview.net (2024).
+- ACL Anthology (acl, emnlp, naacl): venue, volume and paper pages.
+- The enrichment APIs (see providers.py): OpenAlex and Crossref works (DOI filters and title
+  search), Semantic Scholar paper batch and search. OpenAlex does not know one DOI in ten, so
+  the fallback to the next provider gets exercised.
+
+The real host is the first component of the path (http://127.0.0.1:8000/dblp.org/db/conf/aaai/index.html),
+which is how `MockSiteDownloadHandler` (MOCK_SITE_URL) sends the spiders' requests here. The
+providers are pointed here by their settings, e.g. OPENALEX_URL = "http://127.0.0.1:8000/api.openalex.org/works".
+
+    python mocksite.py -port 8000 -papers 50000 -latency 0.05 -errors 0.01
+    python main.py -confs cvpr -years 2023 -queries "" --nocrossref -mocksite http://127.0.0.1:8000
+
+See also `loadtest.py`, which starts this server and reports the crawl throughput.
+"""
+import argparse
+import html
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+YEARS = [str(year) for year in range(2013, 2025)]
+
+# Title words, so that the usual queries ("relation", "emotion"...) match a share of the papers.
+TOPICS = ["relation extraction", "emotion recognition", "correlation learning", "facial expression analysis",
+          "multimodal fusion", "graph neural networks", "speech synthesis", "object detection",
+          "language models", "reinforcement learning", "image segmentation", "causal inference"]
+
+# A CVF conference from 2018 on lists its papers by day.
+CVF_DAYS = 3
+
+
+def paper_title(venue, year, i):
+    return "{} {} paper {}: {} at scale".format(venue, year, i, TOPICS[i % len(TOPICS)])
+
+
+def paper_authors(i):
+    return ["Author {}".format(i % 997), "Author {}".format((i * 7 + 3) % 997)]
+
+
+def paper_abstract(venue, year, i):
+    return ("We study {} on the synthetic {} {} benchmark. Code is available at "
+            "https://github.com/example/paper{}.").format(TOPICS[i % len(TOPICS)], venue, year, i)
+
+
+class MockSite:
+    """Generates the pages. Every venue-year has `papers` papers, dblp journals one volume a year."""
+
+    def __init__(self, papers=1000, latency=0.0, errors=0.0, seed=0):
+        self.papers = papers
+        self.latency = latency
+        self.errors = errors
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+
+    def fail(self):
+        with self.lock:
+            return self.errors > 0 and self.random.random() < self.errors
+
+    def delay(self):
+        # Exponentially distributed around `latency`, like the response times of a real site.
+        if self.latency > 0:
+            with self.lock:
+                delay = self.random.expovariate(1 / self.latency)
+            time.sleep(delay)
+
+    def page(self, host, path, query, body=None):
+        # Returns (content type, body), or None for a page the real site does not have either.
+        if host == "openaccess.thecvf.com":
+            return self.cvf(path, query)
+        if host == "dblp.org":
+            return self.dblp(path)
+        if host in ("openreview.net", "api.openreview.net", "api2.openreview.net"):
+            return self.openreview(host, path, query)
+        if host == "aclanthology.org":
+            return self.acl(path)
+        if host in ("api.openalex.org", "api.crossref.org", "api.semanticscholar.org"):
+            return self.api(host, path, query, body)
+        return None
+
+    # -- CVF ------------------------------------------------------------------------------
+
+    def cvf(self, path, query):
+        if path == "/menu":
+            links = "".join('<dd><a href="/{0}{1}">{0} {1}</a></dd>'.format(venue, year)
+                            for venue in ("CVPR", "ICCV") for year in YEARS)
+            return "text/html", '<html><body><div id="content"><dl>{}</dl></div></body></html>'.format(links)
+
+        match = re.fullmatch(r"/([A-Z]+)(\d{4})", path)
+        if match:
+            venue, year = match.groups()
+            day = query.get("day", [None])[0]
+            if year >= "2018" and day is None:
+                days = "".join('<dd><a href="/{}{}?day={}">Day {}</a></dd>'.format(venue, year, d, d)
+                               for d in range(1, CVF_DAYS + 1))
+                days += '<dd><a href="/{}{}?day=all">All days</a></dd>'.format(venue, year)
+                return "text/html", '<html><body><div id="content"><dl>{}</dl></div></body></html>'.format(days)
+            if day is None or day == "all":
+                numbers = range(self.papers)
+            else:
+                numbers = range(int(day) - 1, self.papers, CVF_DAYS)
+            entries = "".join(
+                '<dt class="ptitle"><br><a href="/content/{0}{1}/html/paper_{2}.html">{3}</a></dt>'
+                '<dd><form>{4}</form></dd>'
+                '<dd>[<a href="/content/{0}{1}/papers/paper_{2}.pdf">pdf</a>]</dd>'.format(
+                    venue, year, i, html.escape(paper_title(venue, year, i)),
+                    "".join('<input type="hidden" name="query_author" value="{}">'.format(a) for a in paper_authors(i)))
+                for i in numbers)
+            return "text/html", '<html><body><div id="content"><dl>{}</dl></div></body></html>'.format(entries)
+
+        match = re.fullmatch(r"/content/([A-Z]+)(\d{4})/html/paper_(\d+)\.html", path)
+        if match:
+            venue, year, i = match.group(1), match.group(2), int(match.group(3))
+            return "text/html", (
+                '<html><body><div id="content"><dl>'
+                '<div id="papertitle">{}</div><div id="authors"><b><i>{}</i></b></div>'
+                '<div id="abstract">{}</div>'
+                '<dd><a href="/content/{}{}/papers/paper_{}.pdf">pdf</a></dd>'
+                '</dl></div></body></html>').format(
+                html.escape(paper_title(venue, year, i)), ", ".join(paper_authors(i)),
+                html.escape(paper_abstract(venue, year, i)), venue, year, i)
+        return None
+
+    # -- dblp -----------------------------------------------------------------------------
+
+    def dblp(self, path):
+        match = re.fullmatch(r"/db/conf/(\w+)/index\.html", path)
+        if match:
+            key = match.group(1)
+            years = "".join(
+                '<header class="h2"><h2 id="{1}">{1}</h2></header>'
+                '<ul class="publ-list"><li class="entry editor"><nav class="publ">'
+                '<a class="toc-link" href="https://dblp.org/db/conf/{0}/{0}{1}.html">[contents]</a></nav></li></ul>'.format(key, year)
+                for year in reversed(YEARS))
+            return "text/html", '<html><body><div id="main">{}</div></body></html>'.format(years)
+
+        match = re.fullmatch(r"/db/journals/(\w+)/index\.html", path)
+        if match:
+            key = match.group(1)
+            volumes = "".join(
+                '<li><a href="https://dblp.org/db/journals/{0}/{0}{1}.html">Volume {1}</a>: {2}</li>'.format(
+                    key, int(year) - 1978, year)
+                for year in reversed(YEARS))
+            return "text/html", '<html><body><div id="info-section"></div><ul>{}</ul></body></html>'.format(volumes)
+
+        match = re.fullmatch(r"/db/(conf|journals)/(\w+)/\w+?(\d+)\.html", path)
+        if match:
+            kind, key, number = match.groups()
+            year = number if kind == "conf" else str(int(number) + 1978)
+            entries = "".join(
+                '<li class="entry inproceedings"><nav class="publ">'
+                '<a href="https://doi.org/10.5555/{0}.{1}.{2}">ee</a></nav>'
+                '<cite class="data tts-content">{3}: <span class="title">{4}</span></cite></li>'.format(
+                    key, year, i,
+                    ", ".join('<span itemprop="author"><a href="#"><span>{}</span></a></span>'.format(a)
+                              for a in paper_authors(i)),
+                    html.escape(paper_title(key.upper(), year, i)))
+                for i in range(self.papers))
+            return "text/html", '<html><body><div id="main"><ul class="publ-list">{}</ul></div></body></html>'.format(entries)
+        return None
+
+    # -- OpenReview -----------------------------------------------------------------------
+
+    def openreview(self, host, path, query):
+        if host == "openreview.net":
+            return "text/html", "<html><body>OpenReview</body></html>"
+        if path != "/notes":
+            return None
+        year = re.search(r"20\d\d", " ".join(unquote(v) for values in query.values() for v in values)).group(0)
+        offset = int(query.get("offset", ["0"])[0])
+        limit = int(query.get("limit", ["1000"])[0])
+        # The spider asks for every session of a year (oral, spotlight, poster...) through the
+        # content.venue filter. All the papers are posters, so a year has -papers papers in total.
+        venue = query.get("content.venue", ["poster"])[0]
+        papers = self.papers if "poster" in venue.lower() else 0
+        notes = []
+        for i in range(offset, min(offset + limit, papers)):
+            content = {
+                "title": paper_title("ICLR", year, i),
+                "authors": paper_authors(i),
+                "abstract": paper_abstract("ICLR", year, i),
+                "pdf": "/pdf?id=paper{}".format(i),
+            }
+            if host == "api2.openreview.net":
+                # API v2 wraps every field: {"title": {"value": ...}}.
+                content = {key: {"value": value} for key, value in content.items()}
+            else:
+                content["_bibtex"] = "@inproceedings{{paper{},\n}}".format(i)
+            notes.append({"id": "paper{}".format(i), "content": content})
+        return "application/json", json.dumps({"notes": notes, "count": papers})
+
+    # -- ACL Anthology --------------------------------------------------------------------
+
+    def acl(self, path):
+        match = re.fullmatch(r"/venues/(\w+)/?", path)
+        if match:
+            venue = match.group(1)
+            rows = "".join(
+                '<div class="row"><div class="col-sm-1">{1}</div><div class="col-sm">'
+                '<ul><li><a class="align-middle" href="/volumes/{1}.{0}-long/">Long Papers</a></li></ul></div></div>'.format(venue, year)
+                for year in reversed(YEARS))
+            return "text/html", '<html><body><div id="main-container">{}</div></body></html>'.format(rows)
+
+        match = re.fullmatch(r"/volumes/(\d{4})\.(\w+)-long/?", path)
+        if match:
+            year, venue = match.groups()
+            entries = ['<p class="d-sm-flex align-items-stretch"><span class="d-block"><strong>'
+                       '<a class="align-middle" href="/{}.{}-long.0/">Front matter</a></strong></span></p>'.format(year, venue)]
+            for i in range(1, self.papers + 1):
+                entries.append(
+                    '<p class="d-sm-flex align-items-stretch">'
+                    '<span class="d-block mr-2 list-button-row">'
+                    '<a class="badge badge-primary align-middle mr-1" href="https://aclanthology.org/{0}.{1}-long.{2}.pdf">pdf</a></span>'
+                    '<span class="d-block"><strong><a class="align-middle" href="/{0}.{1}-long.{2}/">{3}</a></strong><br>'
+                    '{4}</span></p>'
+                    '<div class="card bg-light mb-2 mb-lg-3 collapse abstract-collapse"><div class="card-body p-3 small">{5}</div></div>'.format(
+                        year, venue, i, html.escape(paper_title(venue.upper(), year, i)),
+                        " | ".join('<a href="/people/{0}/">{0}</a>'.format(a) for a in paper_authors(i)),
+                        html.escape(paper_abstract(venue.upper(), year, i))))
+            return "text/html", '<html><body><section id="main"><div>{}</div></section></body></html>'.format("".join(entries))
+
+        match = re.fullmatch(r"/(\d{4})\.(\w+)-long\.(\d+)/?", path)
+        if match:
+            year, venue, i = match.group(1), match.group(2), int(match.group(3))
+            return "text/html", (
+                '<html><body><section id="main"><div><h2 id="title"><a href="#">{}</a></h2>'
+                '<p class="lead">{}</p></div>'
+                '<div class="card-body acl-abstract"><span>{}</span></div>'
+                '<div class="acl-paper-link-block"><a class="btn btn-primary" href="https://aclanthology.org/{}.{}-long.{}.pdf">PDF</a></div>'
+                '</section></body></html>').format(
+                html.escape(paper_title(venue.upper(), year, i)),
+                "".join('<a href="/people/{0}/">{0}</a>'.format(a) for a in paper_authors(i)),
+                html.escape(paper_abstract(venue.upper(), year, i)), year, venue, i)
+        return None
+
+
+    # -- Enrichment APIs ------------------------------------------------------------------
+
+    @staticmethod
+    def citations(key):
+        return zlib.crc32(key.encode("utf-8")) % 1000
+
+    def api(self, host, path, query, body):
+        # A DOI is known if it looks like the ones of the mock dblp (10.5555/...), a title search
+        # finds the title itself and two others.
+        param = lambda name: query.get(name, [""])[0]
+        if host == "api.openalex.org" and path == "/works":
+            if param("filter").startswith("doi:"):
+                dois = param("filter")[len("doi:"):].split("|")
+                found = [(doi, doi) for doi in dois if doi.startswith("10.5555/") and self.citations(doi) % 10]
+            else:
+                found = [(None, title) for title in (param("search"), param("search") + " revisited", "unrelated work")]
+            results = [{"title": title, "doi": "https://doi.org/" + doi if doi else None,
+                        "cited_by_count": self.citations(title),
+                        "topics": [{"display_name": TOPICS[self.citations(title) % len(TOPICS)]}],
+                        "concepts": [{"display_name": "Computer science"}]} for doi, title in found]
+            return "application/json", json.dumps({"results": results})
+
+        if host == "api.crossref.org" and path == "/works":
+            if param("filter"):
+                dois = [part[len("doi:"):] for part in param("filter").split(",")]
+                found = [(doi, doi) for doi in dois if doi.startswith("10.5555/")]
+            else:
+                title = param("query.bibliographic")
+                found = [(None, title), (None, title + " revisited")]
+            items = [{"DOI": doi, "title": [title], "is-referenced-by-count": self.citations(title)}
+                     for doi, title in found]
+            return "application/json", json.dumps({"message": {"items": items}})
+
+        if host == "api.semanticscholar.org" and path == "/graph/v1/paper/batch" and body is not None:
+            entries = []
+            for paper_id in json.loads(body)["ids"]:
+                doi = paper_id[len("DOI:"):]
+                entries.append({"title": doi, "externalIds": {"DOI": doi}, "citationCount": self.citations(doi),
+                                "fieldsOfStudy": ["Computer Science"]} if doi.startswith("10.5555/") else None)
+            return "application/json", json.dumps(entries)
+
+        if host == "api.semanticscholar.org" and path == "/graph/v1/paper/search":
+            title = param("query")
+            return "application/json", json.dumps({"data": [
+                {"title": title, "externalIds": {}, "citationCount": self.citations(title), "fieldsOfStudy": None}]})
+        return None
+
+
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as with the real sites
+
+    def do_GET(self, body=None):
+        site = self.server.site
+        url = urlsplit(self.path)
+        host, _, path = url.path.lstrip("/").partition("/")
+        site.delay()
+
+        if site.fail():
+            self.answer(500, "text/plain", b"Injected error")
+            return
+        page = site.page(host, "/" + path, parse_qs(url.query), body)
+        if page is None:
+            self.answer(404, "text/plain", b"Not found")
+            return
+        content_type, body = page
+        self.answer(200, content_type + "; charset=utf-8", body.encode("utf-8"))
+
+    def do_POST(self):
+        self.do_GET(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+
+    def answer(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port, site, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), MockSiteHandler)
+    server.daemon_threads = True
+    server.site = site
+    return server
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Serve a synthetic copy of the conference websites.')
+    parser.add_argument('-port', default=8000, type=int, help='The port to listen on')
+    parser.add_argument('-papers', default=1000, type=int, help='Number of papers of every conference-year')
+    parser.add_argument('-latency', default=0.0, type=float, help='Mean response time in seconds')
+    parser.add_argument('-errors', default=0.0, type=float, help='Share of the requests answered with a 500 error')
+    parser.add_argument('-seed', default=0, type=int, help='Seed of the latency and error draws')
+
+    args = parser.parse_args()
+
+    server = make_server(args.port, MockSite(args.papers, args.latency, args.errors, args.seed))
+    print("Serving {} papers per conference-year on http://127.0.0.1:{}".format(args.papers, server.server_port), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,93 @@
+"""Refresh the citation counts of an existing output file without crawling again.
+
+Rows with a DOI are looked up 50 at a time with OpenAlex's doi filter, the others by
+title search. Only `doi`, `title` and `cited_by_count` are requested, and the file is
+rewritten in place once every row has been looked up.
+
+    python refresh.py -file data.csv -mailto you@example.com
+"""
+import argparse
+import csv
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from scrapy.utils.project import get_project_settings
+
+from crawl_conf.openalex import OpenAlexClient, MAX_DOIS_PER_REQUEST, SEARCH_PER_PAGE, normalize_doi, parse_works
+
+
+def best_title_match(client, title):
+    # Same matching as CrawlPipeline: fuzzy-match the title against the top search results.
+    from fuzzywuzzy import fuzz, process
+
+    response = client.search_works(re.sub(r'\W+', ' ', title).lower(), select="title,cited_by_count,doi",
+                                   per_page=SEARCH_PER_PAGE)
+    if response is None or response.status_code != 200:
+        return None
+    results = [work for work in parse_works(response.content) if work.title]
+    if not results:
+        return None
+    best_match, _ = process.extractOne(title, [work.title for work in results], scorer=fuzz.ratio)
+    return next(work for work in results if work.title == best_match)
+
+
+def refresh(path, client, workers):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = reader.fieldnames
+        rows = list(reader)
+
+    # DOI lookups, batched, with several batches in flight (the client's limiter sets the pace).
+    dois = sorted({normalize_doi(row.get("doi")) for row in rows if row.get("doi")})
+    chunks = [dois[i:i + MAX_DOIS_PER_REQUEST] for i in range(0, len(dois), MAX_DOIS_PER_REQUEST)]
+    works = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for found in executor.map(lambda chunk: client.get_works_by_dois(chunk, select="doi,cited_by_count"), chunks):
+            works.update(found)
+
+    # Title search for the rows without a DOI, or whose DOI OpenAlex does not know.
+    by_title = [row for row in rows if normalize_doi(row.get("doi")) not in works and row.get("title")]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        title_works = list(executor.map(lambda row: best_title_match(client, row["title"]), by_title))
+
+    updated = 0
+    for row in rows:
+        work = works.get(normalize_doi(row.get("doi")))
+        if work is not None and str(work.cited_by_count) != row.get("citation_count"):
+            row["citation_count"] = work.cited_by_count
+            updated += 1
+    for row, work in zip(by_title, title_works):
+        if work is not None and str(work.cited_by_count) != row.get("citation_count"):
+            row["citation_count"] = work.cited_by_count
+            updated += 1
+
+    # Write next to the original, then swap it in, so an interrupted refresh leaves the file intact.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".part")
+    with os.fdopen(fd, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+    print("{} rows, {} looked up by DOI, {} by title, {} citation counts updated".format(
+        len(rows), len(rows) - len(by_title), len(by_title), updated))
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Refresh the citation counts of an output file.')
+    parser.add_argument('-file', required=True, type=str, help='The CSV file written by main.py')
+    parser.add_argument('-mailto', default=None, type=str, help='Your email address, sent to OpenAlex to use its polite pool')
+    parser.add_argument('-workers', default=8, type=int, help='Number of lookups in flight')
+
+    args = parser.parse_args()
+
+    settings = get_project_settings()
+    if args.mailto is not None:
+        settings.set('OPENALEX_MAILTO', args.mailto)
+
+    client = OpenAlexClient.from_settings(settings)
+    client.pool_size = max(client.pool_size, args.workers)  # one kept-alive connection per worker
+    refresh(args.file, client, args.workers)
@@ -0,0 +1,49 @@
+"""Run the spiders again on the responses they failed on, once they are fixed, without crawling.
+
+Responses whose callback raised are kept in the quarantine directory (QUARANTINE_DIR). This
+runs the callbacks on them again, sends the recovered papers through the usual pipelines
+(query filter, OpenAlex...) and appends them to the output file. Responses recovered are
+removed from the quarantine, the ones still failing stay there.
+
+    python replay.py -out data.csv -queries "relation, correlation"
+"""
+import argparse
+import os
+
+from scrapy.crawler import CrawlerProcess
+from scrapy.utils.project import get_project_settings
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser(description='Re-extract the quarantined responses.')
+    parser.add_argument('-dir', default=None, type=str, help='The quarantine directory (default: QUARANTINE_DIR)')
+    parser.add_argument('-spiders', default=None, type=str, help='Only replay these spiders, e.g. "ijcai,nips"')
+    parser.add_argument('-queries', default="", type=str, help='The queries of the crawl (default: keep every paper)')
+    parser.add_argument('-out', default='data.csv', type=str, help='The CSV file the papers are appended to')
+    parser.add_argument('--nocrossref', action='store_true', help='Do not request extra details through API call from Crossref')
+
+    args = parser.parse_args()
+
+    setting = get_project_settings()
+    directory = args.dir or setting.get('QUARANTINE_DIR')
+    setting.set('QUARANTINE_DIR', directory)
+    setting.set('QUARANTINE_REPLAY_DIR', directory)
+    # Append, with a header only for a new file.
+    setting.set('FEEDS', {args.out: {
+        'format': 'csv',
+        'item_export_kwargs': {'include_headers_line': not os.path.exists(args.out)},
+    }})
+
+    process = CrawlerProcess(setting)
+
+    if args.spiders is not None:
+        names = [name.strip() for name in args.spiders.split(",") if name.strip()]
+    else:
+        names = sorted(name for name in os.listdir(directory) if os.path.isdir(os.path.join(directory, name)))
+
+    for name in names:
+        # The spiders do not crawl from their start urls here, the years are not used.
+        process.crawl(name, years="", queries=args.queries, nocrossref=args.nocrossref)
+
+    process.start()